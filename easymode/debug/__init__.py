@@ -4,7 +4,7 @@ Tools for debugging python applications
 from StringIO import StringIO
 import inspect
 
-__all__ = ('stack_trace', 'middleware')
+__all__ = ('stack_trace', 'middleware', 'metrics')
 
 def stack_trace(depth=None):
     """
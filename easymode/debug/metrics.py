@@ -0,0 +1,220 @@
+"""
+Collects metrics of the cache middlewares in :mod:`easymode.debug.middleware`.
+
+When :ref:`cache_metrics_sink` is set, the middlewares count the hits, misses
+and stores of each url pattern and language, time each cache operation and
+measure the length of the cache keys, and report these to the sink. Easymode
+comes with a :class:`MemorySink`, which keeps the metrics in the memory of the
+process, and a :class:`StatsdSink`, which sends them to a statsd server. When
+no sink is set, nothing is measured.
+
+The url pattern of a request is the one django resolved, the path is never
+resolved again for the metrics. Misses are counted when the view is about
+to be called, and hits under the pattern that was stored with the page.
+
+A sink is any class with these methods:
+
+count(event, pattern, language)
+    Called when a page is found in the cache (``'hit'``), is not found
+    (``'miss'``) or is stored (``'store'``).
+timing(operation, milliseconds)
+    Called after each cache operation of the middlewares, which are
+    ``'get_headers'``, ``'get'``, ``'set_headers'`` and ``'set'``.
+key_size(size)
+    Called with the length of the key of each page that is looked up or stored.
+"""
+import bisect
+import json
+import re
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, Http404
+from django.utils import translation
+
+try:
+    from importlib import import_module
+except ImportError:
+    from django.utils.importlib import import_module
+
+
+__all__ = ('MemorySink', 'StatsdSink', 'get_sink', 'get_url_pattern',
+    'get_request_language', 'timed', 'cache_metrics')
+
+# the upper bounds of the buckets of the latency histograms, in milliseconds.
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# the pattern of requests whose path can not be resolved.
+UNRESOLVED = 'unresolved'
+
+# characters that have a meaning in the statsd protocol.
+STATSD_RESERVED_REGEX = re.compile(r'[^\w\-]+')
+
+
+class MemorySink(object):
+    """
+    Keeps the metrics in the memory of the current process. The latencies of
+    each operation are counted in the buckets of a histogram, the upper bound
+    of each bucket is in ``buckets``.
+
+    :meth:`snapshot` returns the metrics, :func:`cache_metrics` serves them as
+    json.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        "Forgets all metrics."
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.key_sizes = {'count': 0, 'total': 0, 'min': None, 'max': None}
+
+    def count(self, event, pattern, language):
+        key = (event, pattern, language)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def timing(self, operation, milliseconds):
+        with self._lock:
+            histogram = self.histograms.get(operation, None)
+            if histogram is None:
+                # the last bucket counts the latencies above the highest bound
+                histogram = self.histograms[operation] = [0] * (len(self.buckets) + 1)
+            histogram[bisect.bisect_left(self.buckets, milliseconds)] += 1
+
+    def key_size(self, size):
+        with self._lock:
+            sizes = self.key_sizes
+            sizes['count'] += 1
+            sizes['total'] += size
+            if sizes['min'] is None or size < sizes['min']:
+                sizes['min'] = size
+            if sizes['max'] is None or size > sizes['max']:
+                sizes['max'] = size
+
+    def snapshot(self):
+        """
+        Returns a copy of the metrics that can be serialized as json.
+
+        :rtype: A :class:`dict` with a list of ``counters``, the ``latencies``\
+            of each operation as a list of [upper bound, count] pairs, where\
+            the upper bound of the last bucket is ``None``, and the count,\
+            total, min, max and mean of the ``key_sizes``.
+        """
+        with self._lock:
+            counters = [{'event': event, 'pattern': pattern, 'language': language, 'count': count}
+                for ((event, pattern, language), count) in sorted(self.counters.iteritems())]
+            bounds = list(self.buckets) + [None]
+            latencies = dict((operation, [list(x) for x in zip(bounds, histogram)])
+                for (operation, histogram) in self.histograms.iteritems())
+            key_sizes = dict(self.key_sizes)
+
+        key_sizes['mean'] = key_sizes['count'] and float(key_sizes['total']) / key_sizes['count'] or None
+        return {'counters': counters, 'latencies': latencies, 'key_sizes': key_sizes}
+
+
+class StatsdSink(object):
+    """
+    Sends the metrics to a statsd server over udp. The counters are named
+    ``<prefix>.<event>.<pattern>.<language>``, the latencies
+    ``<prefix>.latency.<operation>`` and the key sizes ``<prefix>.key_size``.
+
+    Udp does not wait for the server, and packets that can not be sent are
+    dropped, so a missing server does not slow down the site.
+    """
+    def __init__(self, host='127.0.0.1', port=8125, prefix='easymode.cache'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, name, value, metric_type):
+        "Sends one metric, ``metric_type`` is the statsd type, like ``c`` or ``ms``."
+        try:
+            self._socket.sendto('%s.%s:%s|%s' % (self.prefix, name, value, metric_type), self.address)
+        except socket.error:
+            pass
+
+    def count(self, event, pattern, language):
+        self.send('%s.%s.%s' % (event, STATSD_RESERVED_REGEX.sub('_', pattern),
+            STATSD_RESERVED_REGEX.sub('_', language)), 1, 'c')
+
+    def timing(self, operation, milliseconds):
+        self.send('latency.%s' % operation, '%.3f' % milliseconds, 'ms')
+
+    def key_size(self, size):
+        self.send('key_size', size, 'h')
+
+
+_sink = None
+
+def get_sink():
+    """
+    Returns the sink configured by :ref:`cache_metrics_sink`, or None if no
+    sink is configured.
+    """
+    global _sink
+
+    sink_path = getattr(settings, 'CACHE_METRICS_SINK', None)
+    if sink_path is None:
+        return None
+
+    options = getattr(settings, 'CACHE_METRICS_SINK_OPTIONS', {})
+    if _sink is None or _sink.configuration != (sink_path, options):
+        (module_name, class_name) = sink_path.rsplit('.', 1)
+        sink = getattr(import_module(module_name), class_name)(**options)
+        sink.configuration = (sink_path, options)
+        _sink = sink
+
+    return _sink
+
+def get_url_pattern(request):
+    """
+    Returns the name of the url pattern that matched ``request``, or the dotted
+    path of it's view when the pattern has no name. The path is not resolved
+    again, when django did not resolve it yet :data:`UNRESOLVED` is returned.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNRESOLVED
+
+    if match.url_name:
+        return match.url_name
+    return '%s.%s' % (match.func.__module__, getattr(match.func, '__name__', match.func.__class__.__name__))
+
+def get_request_language(request):
+    "Returns the language of ``request``."
+    return getattr(request, 'LANGUAGE_CODE', None) or translation.get_language()
+
+def timed(sink, operation, function, *args):
+    """
+    Calls ``function`` with ``args`` and reports how long it took to ``sink``
+    as ``operation``. When ``sink`` is None the call is not timed.
+    """
+    if sink is None:
+        return function(*args)
+
+    start = time.time()
+    try:
+        return function(*args)
+    finally:
+        sink.timing(operation, (time.time() - start) * 1000)
+
+@staff_member_required
+def cache_metrics(request):
+    """
+    Serves the metrics of a :class:`MemorySink` as json, see
+    :meth:`MemorySink.snapshot`. Add it to your urls like this::
+
+        url(r'^cache-metrics/$', 'easymode.debug.metrics.cache_metrics')
+    """
+    sink = get_sink()
+    if not hasattr(sink, 'snapshot'):
+        raise Http404("CACHE_METRICS_SINK does not keep metrics in memory")
+
+    return HttpResponse(json.dumps(sink.snapshot()), content_type='application/json')
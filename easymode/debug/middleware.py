@@ -1,26 +1,51 @@
 """
 Replacements for django middlewares that allow you to see what is put in to the cache
 and comes out of the cache.
+
+The keys are only logged when the root logger logs debug messages. When
+:ref:`cache_metrics_sink` is set, the hits, misses, stores, latencies and
+key sizes are reported to it, see :mod:`easymode.debug.metrics`. Neither
+does any cache operations besides the ones django's cache middlewares do.
 """
 import logging
 
 from django.conf import settings
 from django.core.cache import cache
-from django.utils.cache import get_cache_key, learn_cache_key, patch_response_headers, get_max_age, _generate_cache_header_key
+from django.utils.cache import learn_cache_key, patch_response_headers, get_max_age, \
+    cc_delim_re, _generate_cache_key, _generate_cache_header_key
+
+from easymode.debug.metrics import get_sink, get_url_pattern, get_request_language, timed, \
+    UNRESOLVED
 
-def get_cache_key_parameters(request):
+def get_cache_key_parameters(request, key_prefix=None, headerlist=None):
+    """
+    Returns the key prefix and the values of the headers that are part of the
+    cache key of ``request``, as a list of strings. When ``headerlist`` is not
+    given, it is read from the cache.
+    """
     result = []
-    key_prefix = settings.CACHE_MIDDLEWARE_KEY_PREFIX
+    if key_prefix is None:
+        key_prefix = settings.CACHE_MIDDLEWARE_KEY_PREFIX
     result.append("key_prefix: %s" % key_prefix)
-    cache_key = _generate_cache_header_key(key_prefix, request)
-    headerlist = cache.get(cache_key, None)
+    if headerlist is None:
+        cache_key = _generate_cache_header_key(key_prefix, request)
+        headerlist = cache.get(cache_key, None)
     if headerlist:
         for header in headerlist:
             value = request.META.get(header, None)
             if value is not None:
                 result.append("%s = %s" % (header, value))
     return result
-    
+
+def get_vary_headerlist(response):
+    """
+    Returns the names of the headers in the Vary header of ``response``, the
+    way :func:`django.utils.cache.learn_cache_key` stores them.
+    """
+    if response.has_header('Vary'):
+        return ['HTTP_' + header.upper().replace('-', '_') for header in cc_delim_re.split(response['Vary'])]
+    return []
+
 class DebugUpdateCacheMiddleware(object):
     """
     Same as :class:`~django.middleware.cache.django.middleware.cache.UpdateCacheMiddleware` but is shows you
@@ -55,9 +80,19 @@ class DebugUpdateCacheMiddleware(object):
             return response
         patch_response_headers(response, timeout)
         if timeout:
-            cache_key = learn_cache_key(request, response, timeout, self.key_prefix)
-            cache.set(cache_key, response, timeout)
-            logging.debug("UpdateCacheMiddleware: setting %s -> %s params are: %s" % (cache_key, request.path, get_cache_key_parameters(request)))
+            key_prefix = self.key_prefix
+            sink = get_sink()
+            if sink is not None:
+                # the path is not resolved when the page is found in the cache.
+                response._cache_metrics_pattern = get_url_pattern(request)
+            cache_key = timed(sink, 'set_headers', learn_cache_key, request, response, timeout, key_prefix)
+            timed(sink, 'set', cache.set, cache_key, response, timeout)
+            if sink is not None:
+                sink.key_size(len(cache_key))
+                sink.count('store', response._cache_metrics_pattern, get_request_language(request))
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("UpdateCacheMiddleware: setting %s -> %s params are: %s" % (cache_key, request.path,
+                    get_cache_key_parameters(request, key_prefix, get_vary_headerlist(response))))
         return response
 
 class DebugFetchFromCacheMiddleware(object):
@@ -86,20 +121,46 @@ class DebugFetchFromCacheMiddleware(object):
             request._cache_update_cache = False
             return None # Don't cache requests from authenticated users.
 
-        cache_key = get_cache_key(request, self.key_prefix)
-        if cache_key is None:
+        key_prefix = self.key_prefix
+        sink = get_sink()
+        # this is what get_cache_key does, but the header list is kept so it
+        # does not have to be fetched again for the log.
+        headerlist = timed(sink, 'get_headers', cache.get, _generate_cache_header_key(key_prefix, request), None)
+        if headerlist is None:
+            # the miss is counted in process_view, when the path is resolved.
+            request._cache_metrics_miss = sink is not None
             request._cache_update_cache = True
             return None # No cache information available, need to rebuild.
 
-        response = cache.get(cache_key, None)
+        cache_key = _generate_cache_key(request, 'GET', headerlist, key_prefix)
+        response = timed(sink, 'get', cache.get, cache_key, None)
+        if sink is not None:
+            sink.key_size(len(cache_key))
+            if response is None:
+                request._cache_metrics_miss = True
+            else:
+                sink.count('hit', getattr(response, '_cache_metrics_pattern', UNRESOLVED),
+                    get_request_language(request))
+
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
         if response is None:
-            logging.debug("FetchFromCacheMiddleware: %s is %s.  paramters(%s)" % ( cache_key, request.path, get_cache_key_parameters(request)))
+            if debug:
+                logging.debug("FetchFromCacheMiddleware: %s is %s.  paramters(%s)" % ( cache_key, request.path, get_cache_key_parameters(request, key_prefix, headerlist)))
             request._cache_update_cache = True
             return None # No cache information available, need to rebuild.
-        logging.debug("Found %s -> %s in the cache. parameters(%s)" % (cache_key, request.path, get_cache_key_parameters(request)))
+        if debug:
+            logging.debug("Found %s -> %s in the cache. parameters(%s)" % (cache_key, request.path, get_cache_key_parameters(request, key_prefix, headerlist)))
         request._cache_update_cache = False
         return response
 
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        "Counts the misses, now the url pattern is known."
+        if getattr(request, '_cache_metrics_miss', False):
+            sink = get_sink()
+            if sink is not None:
+                sink.count('miss', get_url_pattern(request), get_request_language(request))
+        return None
+
 class DebugCacheMiddleware(DebugUpdateCacheMiddleware, DebugFetchFromCacheMiddleware):
     """
     combines :class:`~easymode.debug.middleware.DebugFetchFromCacheMiddleware` and 
@@ -5,7 +5,7 @@ from django.db.models.base import ModelBase
 
 from easymode.i18n.admin import forms
 from easymode.i18n.admin.generic import LocalizableGenericInlineFormSet
-from easymode.utils.languagecode import get_all_language_codes, localize_fieldnames, get_real_fieldname
+from easymode.utils.languagecode import get_all_language_codes, localize_fieldnames
 
 
 __all__ = ('L10n', 'lazy_localized_list')
@@ -118,7 +118,7 @@ class L10n(object):
         added_fields = []
         for field in self.model.localized_fields:
             for language in get_all_language_codes():
-                added_fields.append(get_real_fieldname(field, language))
+                added_fields.append(self.model.localized_columns[(field, language)])
 
         # hide added fields from form and admin
         cls.exclude = added_fields
@@ -157,10 +157,10 @@ class L10n(object):
                         break
 
             # Make certain properties lazy and internationalized
-            cls.list_display_links = lazy_localized_list(cls.list_display_links, self.model.localized_fields)
-            cls.list_display = lazy_localized_list(cls.list_display, self.model.localized_fields)
-            cls.list_editable = lazy_localized_list(cls.list_editable, self.model.localized_fields)
-            cls.search_fields = lazy_localized_list(cls.search_fields, self.model.localized_fields)
+            cls.list_display_links = lazy_localized_list(cls.list_display_links, self.model.localized_columns)
+            cls.list_display = lazy_localized_list(cls.list_display, self.model.localized_columns)
+            cls.list_editable = lazy_localized_list(cls.list_editable, self.model.localized_columns)
+            cls.search_fields = lazy_localized_list(cls.search_fields, self.model.localized_columns)
             
         else:
             def get_formset(self, request, obj=None, **kwargs):
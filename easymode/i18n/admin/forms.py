@@ -4,7 +4,7 @@ from django.utils.datastructures import SortedDict
 from django.utils.translation import get_language
 
 from easymode.i18n.admin.widgets import WidgetWrapper
-from easymode.utils.languagecode import get_real_fieldname
+from easymode.i18n.meta.fields import get_localized_values
 
 
 __all__ = ('make_localised_form',)
@@ -25,20 +25,24 @@ class LocalisedForm(object):
         self.language = get_language()
         
         locale_data = initial or SortedDict()
+        localized_columns = self._meta.model.localized_columns
+        if instance is not None:
+            # the widgets show where each value came from.
+            localized_values = get_localized_values(instance, self.localized_fields, provenance=True)
 
         # Set up the initial data for the form
         for localized_field in self.localized_fields:
             # determine localized name of the field, because it is called like
             # that in the initial dict
-            local_name = get_real_fieldname(localized_field, self.language)
+            local_name = localized_columns[(localized_field, self.language)]
 
             if initial: # get value from initial if it is defined
                 initial_value = initial.get(local_name)
                 if not initial_value and instance: # try model if defined
-                    initial_value = getattr(instance, localized_field)
+                    initial_value = localized_values[localized_field]
                 locale_data[localized_field] = initial_value
             elif instance is not None:
-                locale_data[localized_field] = getattr(instance, localized_field)
+                locale_data[localized_field] = localized_values[localized_field]
             
         super(LocalisedForm, self).__init__(data, files, auto_id, prefix,
                                             locale_data, error_class, 
@@ -91,7 +95,7 @@ class LocalisedForm(object):
             f = getattr(self.instance.__class__, localized_field, None)
             if f and f.unique:
                 if f.unique:
-                    local_name = get_real_fieldname(localized_field, self.language)
+                    local_name = self.instance.localized_columns[(localized_field, self.language)]
                     localized_fields_checks.append((localized_field, local_name))
                     
         return localized_fields_checks
@@ -2,9 +2,12 @@ import os
 import sys
 
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
 
 from easymode import i18n
 from easymode.i18n import meta
+from easymode.i18n.query import LocalizedQuerySet
 
 
 __all__ = ('I18n',)
@@ -24,18 +27,40 @@ class I18n(object):
     >>>     iamatranslatedfield = models.CharField(max_length=255)
     
     Now ``iamatranslatedfield`` it's value can vary by language.
+
+    When ``defer_languages=True`` is passed, querysets of the model do not load
+    the columns of languages that are not needed in the current language, see
+    :meth:`~easymode.i18n.query.LocalizedQuerySet.for_language`. The default
+    is ``settings.I18N_DEFER_LANGUAGES``.
+
+    When ``storage='table'`` is passed, the values of the localized fields are
+    not stored in a column per language, but in the translation table of the
+    ``easymode.i18n.translations`` app, see :mod:`easymode.i18n.meta.storage`.
     """
-    def __init__(self, *localized_fields):
+    def __init__(self, *localized_fields, **options):
         """initialize the decorator"""
         self.localized_fields = localized_fields
+        self.defer_languages = options.pop('defer_languages',
+            getattr(settings, 'I18N_DEFER_LANGUAGES', False))
+        self.storage = options.pop('storage', 'columns')
+        if self.storage not in meta.STORAGES:
+            raise ValueError("I18n storage must be one of %s, not '%s'" % (', '.join(meta.STORAGES), self.storage))
+        if self.storage == 'table' and 'easymode.i18n.translations' not in settings.INSTALLED_APPS:
+            raise ImproperlyConfigured("I18n(storage='table') requires 'easymode.i18n.translations' "
+                "in the INSTALLED_APPS")
+        if options:
+            raise TypeError("I18n got unexpected keyword arguments: %s" % ', '.join(options))
         
     def __call__(self, cls):
         """Executes the decorator on the cls."""
         model_dir = os.path.dirname(sys.modules[cls.__module__].__file__) + getattr(settings, 'LOCALE_POSTFIX', '')
-        cls = meta.localize_fields(cls, self.localized_fields)
+        cls = meta.localize_fields(cls, self.localized_fields, self.storage)
         if getattr(settings, 'AUTO_CATALOG', False):
             i18n.register(cls, getattr(settings, 'LOCALE_DIR', None) or model_dir )
         
+        cls.defer_languages = self.defer_languages
+        self.add_localized_queryset(cls)
+
         # add permission for editing the untranslated fields in this model
         perm = (("can_edit_untranslated_fields_of_%s" % cls.__name__.lower(),
             "Can edit untranslated fields"),)
@@ -43,3 +68,20 @@ class I18n(object):
         cls._meta.permissions += type(cls._meta.permissions)(perm)
 
         return cls
+
+    def add_localized_queryset(self, cls):
+        """
+        Makes the default manager of ``cls`` return a
+        :class:`~easymode.i18n.query.LocalizedQuerySet`, unless ``cls`` has
+        a custom manager.
+        """
+        from easymode.tree.xml.query import QuerySetManager, \
+            XmlSerializableQuerySet, LocalizedXmlSerializableQuerySet
+
+        manager = getattr(cls, 'objects', None)
+        if type(manager) is models.Manager:
+            cls.add_to_class('objects', QuerySetManager(LocalizedQuerySet))
+        elif isinstance(manager, QuerySetManager) \
+            and manager.queryset_class is XmlSerializableQuerySet:
+            # toxml was applied before I18n.
+            cls.add_to_class('objects', QuerySetManager(LocalizedXmlSerializableQuerySet))
@@ -11,18 +11,23 @@ import copy
 from django.conf import settings
 from django.contrib.admin.options import FORMFIELD_FOR_DBFIELD_DEFAULTS
 from django.db.models.fields import NOT_PROVIDED
+from django.db.models.signals import post_save
 from django.utils import translation
 
 from easymode.utils.languagecode import get_all_language_codes, \
-    get_real_fieldname
-from easymode.i18n.meta.fields import DefaultFieldDescriptor
+    LocalizedColumns
+from easymode.i18n.meta.fields import DefaultFieldDescriptor, \
+    clear_saved_values, clearing_refresh_from_db
+from easymode.i18n.meta.storage import add_translation_attributes
 from easymode.i18n.meta.utils import get_field_from_model_by_name
 
 
-__all__ = ('localize_fields',)
+__all__ = ('localize_fields', 'STORAGES')
 
+# the ways the values of localized fields can be stored, see localize_fields.
+STORAGES = ('columns', 'table')
 
-def localize_fields(cls, localized_fields):
+def localize_fields(cls, localized_fields, storage='columns'):
     """
     For each field name in localized_fields,
     for each language in settings.LANGUAGES,
@@ -30,6 +35,10 @@ def localize_fields(cls, localized_fields):
     and remove the original field, instead
     replace it with a DefaultFieldDescriptor,
     which always returns the field in the current language.
+
+    When ``storage`` is ``'table'``, no fields are added, but attributes
+    that store the values in the translation table, see
+    :mod:`easymode.i18n.meta.storage`.
     """
 
     # never do this twice
@@ -47,16 +56,35 @@ def localize_fields(cls, localized_fields):
     # set the localized fields property
     cls.localized_fields = localized_fields
 
+    # the real names of the localized fields are computed only once. Besides
+    # the languages of the site, the languages that are used to find values
+    # in other languages are in the table as well.
+    languages = set(get_all_language_codes())
+    languages.update([language[:2] for language in languages])
+    languages.update([settings.LANGUAGE_CODE, msgid_language])
+    for (language, fallbacks) in getattr(settings, 'FALLBACK_LANGUAGES', {}).items():
+        languages.add(language)
+        languages.update(fallbacks)
+    cls.localized_columns = LocalizedColumns(localized_fields, languages)
+    column_names = []
+
+    # with table storage, the values are not stored in a field per language.
+    column_languages = get_all_language_codes() if storage == 'columns' else []
+
     for field in localized_fields:
         original_attr = get_field_from_model_by_name(cls, field)
 
-        for cnt, language_code in enumerate(get_all_language_codes()):
+        if storage == 'table':
+            column_names.extend(add_translation_attributes(cls, original_attr))
+
+        for cnt, language_code in enumerate(column_languages):
             i18n_attr = copy.copy(original_attr)
             # add support for south introspection.
             i18n_attr._south_introspects = True
             i18n_attr.original_fieldname = field
             i18n_attr.include_in_xml = False
-            lang_attr_name = get_real_fieldname(field, language_code)
+            lang_attr_name = cls.localized_columns[(field, language_code)]
+            column_names.append(lang_attr_name)
             i18n_attr.name = lang_attr_name
             i18n_attr.creation_counter = i18n_attr.creation_counter + .01 * cnt
             # null must be allowed for the message id language because this
@@ -107,5 +135,16 @@ def localize_fields(cls, localized_fields):
             cls._meta._expire_cache()
             cls._meta._get_fields(reverse=False)
 
+    if storage == 'table':
+        cls.translation_columns = frozenset(column_names)
+
+    # the DefaultFieldDescriptors remember their values, which must be
+    # looked up again after the localized columns were assigned directly and
+    # saved, or loaded again.
+    post_save.connect(clear_saved_values, sender=cls,
+        dispatch_uid='easymode.i18n.meta.clear_saved_values.%s.%s' % (cls.__module__, cls.__name__))
+    if hasattr(cls, 'refresh_from_db'):
+        cls.refresh_from_db = clearing_refresh_from_db(cls.refresh_from_db)
+
     # return the finished product
     return cls
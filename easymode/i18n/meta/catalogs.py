@@ -0,0 +1,119 @@
+"""
+Contains a cache for the lookups of the contents of localized fields in the
+gettext catalogs.
+
+The message ids of localized fields can be long texts, which are looked up
+in the catalog of the current language and in the catalogs of all it's
+fallback languages, and most of them are not found. The results of these
+lookups are remembered, so the same text is only looked up once in each
+catalog. Only ``settings.I18N_CATALOG_CACHE_SIZE`` results are kept, the
+oldest are discarded. The results are kept by message id, so a lookup that
+was done before costs a single dictionary lookup, and lookups that were not
+found only remember that they were not found.
+
+When a catalog is replaced or translations are merged into it, the results
+from before the change are not used anymore. After compiling catalogs in a
+way easymode does not notice, call :func:`clear`. This is done automatically
+when django-rosetta saves a catalog. :func:`clear` sends the
+:data:`catalogs_cleared` signal, so other caches that contain translations,
+like the :mod:`xml fragment cache <easymode.tree.xml.fragments>`, are
+cleared as well.
+"""
+import threading
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils import translation
+from django.utils.safestring import SafeData, mark_safe
+from django.utils.translation.trans_real import translation as translation_catalogs
+
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+
+__all__ = ('ugettext', 'clear', 'catalogs_cleared')
+
+# The number of lookups that are remembered by default.
+DEFAULT_CACHE_SIZE = 10000
+
+#: Sent by :func:`clear`, after the catalogs have changed.
+catalogs_cleared = Signal()
+
+_entries = OrderedDict()
+_MISSING = object()
+_lock = threading.Lock()
+
+def _catalog_version(catalog):
+    """
+    Returns a value that changes when ``catalog`` is replaced by a new one,
+    or when translations are merged into it.
+    """
+    return (id(catalog), len(getattr(catalog, '_catalog', ())))
+
+def ugettext(msgid, language=None):
+    """
+    Returns the translation of ``msgid`` in the catalog of ``language``,
+    which is the current language by default. Like
+    :func:`django.utils.translation.ugettext` the line endings of ``msgid``
+    are normalized and the translation of safe text is marked safe.
+
+    :param msgid: A :class:`unicode` string.
+    :param language: A language code.
+    :rtype: The translation, or ``msgid`` if it is not in the catalog.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    catalog = translation_catalogs(language)
+    key = (language, _catalog_version(catalog), msgid)
+
+    msg = _entries.get(key, _MISSING)
+    if msg is _MISSING:
+        eol_msgid = msgid.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+        msg = catalog.ugettext(eol_msgid)
+        if msg == msgid:
+            # not translated, don't keep the text twice.
+            msg = None
+
+        max_entries = getattr(settings, 'I18N_CATALOG_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        with _lock:
+            _entries[key] = msg
+            for i in xrange(len(_entries) - max_entries):
+                del _entries[iter(_entries).next()]
+
+    if msg is None:
+        msg = msgid
+    if isinstance(msgid, SafeData):
+        return mark_safe(msg)
+    return msg
+
+def clear():
+    """
+    Forgets all lookups, which must be done after the catalogs where
+    compiled again.
+    """
+    with _lock:
+        _entries.clear()
+    catalogs_cleared.send(sender=None)
+
+def _clear_catalogs(**kwargs):
+    clear()
+
+def _clear_catalogs_for_settings(sender, setting, **kwargs):
+    if setting in ('LANGUAGES', 'LOCALE_PATHS', 'I18N_CATALOG_CACHE_SIZE'):
+        clear()
+
+setting_changed.connect(_clear_catalogs_for_settings,
+    dispatch_uid='easymode.i18n.meta.catalogs._clear_catalogs_for_settings')
+
+if 'rosetta' in settings.INSTALLED_APPS:
+    from rosetta.signals import post_save as rosetta_post_save
+    rosetta_post_save.connect(_clear_catalogs,
+        dispatch_uid='easymode.i18n.meta.catalogs._clear_catalogs')
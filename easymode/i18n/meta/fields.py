@@ -4,13 +4,41 @@ Fields used by easymode's i18n.meta package which modifies a class to enable i18
 from django.conf import settings
 from django.utils import translation
 from django.utils.encoding import force_unicode
-from django.utils.translation.trans_real import translation as translation_catalogs
 
+from easymode.i18n.meta import catalogs
 from easymode.i18n.meta.value import GettextVO
 from easymode.i18n.meta.utils import get_localized_property, valid_for_gettext, \
     get_fallback_languages, get_localized_field_name
-from easymode.utils.languagecode import get_real_fieldname
-from easymode.utils.standin import standin_for
+from easymode.utils.standin import standin_with_attributes
+
+# name of the attribute of a model instance, that holds the values returned by
+# it's DefaultFieldDescriptors, by language and field name.
+VALUE_CACHE_ATTRIBUTE = '_localized_value_cache'
+
+def clear_localized_values(obj):
+    """
+    Discards the values of the localized fields remembered by ``obj``, so
+    they are looked up again the next time they are read.
+    """
+    obj.__dict__.pop(VALUE_CACHE_ATTRIBUTE, None)
+
+def clear_saved_values(sender, instance, **kwargs):
+    """
+    Discards the values remembered by ``instance`` after it was saved, so
+    values that were assigned directly to it's localized columns are used.
+    """
+    instance.__dict__.pop(VALUE_CACHE_ATTRIBUTE, None)
+
+def clearing_refresh_from_db(refresh_from_db):
+    """
+    Returns a ``refresh_from_db`` method that calls ``refresh_from_db`` and
+    discards the values remembered by the instance, because the localized
+    columns are loaded again.
+    """
+    def _refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop(VALUE_CACHE_ATTRIBUTE, None)
+        return refresh_from_db(self, *args, **kwargs)
+    return _refresh_from_db
 
 class DefaultFieldDescriptor(property):
     """
@@ -35,15 +63,41 @@ class DefaultFieldDescriptor(property):
         if obj is None:
             return self
 
+        # the value is looked up only once per language for each instance.
         current_language = translation.get_language()
-        real_field_name = get_real_fieldname(self.name, current_language)
+        try:
+            return obj.__dict__[VALUE_CACHE_ATTRIBUTE][current_language][self.name]
+        except KeyError:
+            pass
+
+        value = self.lookup(obj, current_language)
+        obj.__dict__.setdefault(VALUE_CACHE_ATTRIBUTE, {}).setdefault(current_language, {})[self.name] = value
+        return value
+
+    def lookup(self, obj, current_language, provenance=False):
+        """
+        Find the value of the field this descriptor emulates for ``obj`` in
+        ``current_language``, without using the values remembered by ``obj``.
+
+        A value that is stored in the database is returned as it is, unless
+        ``provenance`` is True. Then a standin is returned, which tells
+        where the value came from and what the catalogs contain, see
+        :class:`~easymode.i18n.meta.value.GettextVO`.
+        """
+        real_field_name = obj.localized_columns[(self.name, current_language)]
 
-        vo = GettextVO()
-        
         # first check if the database contains the localized data
-        vo.stored_value = getattr(obj, real_field_name)
+        stored_value = getattr(obj, real_field_name)
         if getattr(settings, 'I18N_NOFALLBACK', False):
-            return vo.stored_value
+            return stored_value
+        if not provenance and valid_for_gettext(stored_value):
+            # the database always wins, so the catalog is only needed to
+            # tell where the value came from.
+            return stored_value
+
+        vo = GettextVO()
+        vo.stored_value = stored_value
+
         # the database does not have our localized data.
         # check if we have a translation, first get the msgid, as a unicode string.
         vo.msgid = get_localized_property(obj, self.name, getattr(settings, 'MSGID_LANGUAGE', settings.LANGUAGE_CODE))
@@ -51,7 +105,7 @@ class DefaultFieldDescriptor(property):
         # check the translation in the current language
         # but avoid empty string and None 
         if valid_for_gettext(vo.msgid):
-            vo.msg = self.to_python(translation.ugettext(force_unicode(vo.msgid)))
+            vo.msg = self.to_python(catalogs.ugettext(force_unicode(vo.msgid), current_language))
         elif valid_for_gettext(vo.stored_value):
             # we can not use the msgid for gettext but we did find a valid
             # translation in the database. Fine we stop here and return that
@@ -83,8 +137,7 @@ class DefaultFieldDescriptor(property):
                     # there might be a translation in any
                     # of the fallback languages.
                     for fallback in get_fallback_languages():
-                        catalog = translation_catalogs(fallback)
-                        msg = catalog.ugettext(force_unicode(vo.msgid))
+                        msg = catalogs.ugettext(force_unicode(vo.msgid), fallback)
                         if self.to_python(msg) != vo.msgid:
                             vo.fallback = self.to_python(msg)
                             break
@@ -99,13 +152,13 @@ class DefaultFieldDescriptor(property):
         if valid_for_gettext(vo.stored_value):
             vo.standin_value_is_from_database = True
             # database always wins
-            return standin_for(vo.stored_value, **vo.__dict__)
+            return standin_with_attributes(vo.stored_value, vo)
         elif valid_for_gettext(vo.msg):
             # runner up is the translation in the native language
-            return standin_for(vo.msg, **vo.__dict__)
+            return standin_with_attributes(vo.msg, vo)
         elif valid_for_gettext(vo.fallback):
             # and last is the translation in a fallback language
-            return standin_for(vo.fallback, **vo.__dict__)
+            return standin_with_attributes(vo.fallback, vo)
 
         assert(valid_for_gettext(vo.msgid))
 
@@ -118,6 +171,7 @@ class DefaultFieldDescriptor(property):
     def __set__(self, obj, value):
         """Write the localised version of the field this descriptor emulates."""
         local_property = get_localized_field_name(obj, self.name)
+        obj.__dict__.pop(VALUE_CACHE_ATTRIBUTE, None)
         setattr(obj, local_property, value)
 
     def get_internal_type(self):
@@ -130,3 +184,36 @@ class DefaultFieldDescriptor(property):
             return force_unicode(self.__get__(obj))
         except TypeError:
             return str(self.__get__(obj))
+
+def get_localized_values(obj, fields=None, provenance=False):
+    """
+    Returns the values of the localized fields of ``obj`` in the current
+    language, as they would be returned by reading each field.
+
+    All values are looked up at once, which is faster than reading the fields
+    one by one when most of them are needed.
+
+    :param obj: An instance of a model decorated with :class:`~easymode.i18n.decorators.I18n`.
+    :param fields: The names of the fields, by default all of ``obj.localized_fields``.
+    :param provenance: When True, values stored in the database are returned as\
+        standins as well, which tell what the catalogs contain. The admin uses\
+        this to show where each value came from. These values are never remembered.
+    :rtype: A :class:`dict` with the value of each field, by name.
+    """
+    current_language = translation.get_language()
+    model = obj.__class__
+    if fields is None:
+        fields = obj.localized_fields
+
+    if provenance:
+        return dict((name, getattr(model, name).lookup(obj, current_language, provenance=True))
+            for name in fields)
+
+    cache = obj.__dict__.setdefault(VALUE_CACHE_ATTRIBUTE, {}).setdefault(current_language, {})
+    values = {}
+    for name in fields:
+        if name not in cache:
+            cache[name] = getattr(model, name).lookup(obj, current_language)
+        values[name] = cache[name]
+
+    return values
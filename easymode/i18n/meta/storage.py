@@ -0,0 +1,228 @@
+"""
+Stores the values of localized fields as rows of the
+:class:`~easymode.i18n.translations.models.Translation` table, instead of in a column for each
+language.
+
+By default :func:`~easymode.i18n.meta.localize_fields` adds a copy of each
+localized field for each language in ``settings.LANGUAGES``, so every
+language makes the table of the model wider and needs a schema migration.
+When a model is decorated with ``I18n(..., storage='table')``, each value is
+stored as a row of (object, field, language, value) instead. The model gets
+the same attributes, like ``title_de``, but these are
+:class:`TranslationDescriptor` instances that read and write the rows, so
+:class:`~easymode.i18n.meta.fields.DefaultFieldDescriptor` works the same
+for both.
+
+The rows of an object are loaded the first time one of it's localized
+fields is read. A :class:`~easymode.i18n.query.LocalizedQuerySet` loads the
+rows of it's objects with one query for each chunk of objects, for the
+languages needed in the current language. Values that are assigned are saved when the object is
+saved.
+"""
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.utils import translation
+from django.utils.encoding import force_unicode
+
+from easymode.i18n.meta.fields import clear_localized_values
+from easymode.i18n.meta.utils import get_language_chains
+from easymode.utils.languagecode import get_all_language_codes
+
+
+__all__ = ('TranslationDescriptor', 'add_translation_attributes',
+    'get_needed_languages', 'get_translation_values', 'load_translations')
+
+# name of the attribute of a model instance that holds the values loaded from
+# the translation table, by language and field name.
+TRANSLATIONS_ATTRIBUTE = '_translations'
+
+# name of the attribute of a model instance that holds the values that were
+# assigned but not saved yet, by (field, language).
+CHANGED_ATTRIBUTE = '_changed_translations'
+
+def _get_translation_model():
+    # imported here so models can be decorated while the apps are loading.
+    from easymode.i18n.translations.models import Translation
+    return Translation
+
+def _get_content_type(model):
+    from django.contrib.contenttypes.models import ContentType
+    return ContentType.objects.get_for_model(model)
+
+class TranslationDescriptor(property):
+    """
+    The attribute of a localized field in one language, like ``title_de``,
+    of a model that stores it's localized fields in the translation table.
+
+    It inherits property, because django only accepts properties as keyword
+    arguments of the constructor of a model.
+    """
+
+    def __init__(self, name, language):
+        """The name param is the name of the localized field."""
+        self.name = name
+        self.language = language
+
+    def __get__(self, obj, typ=None):
+        if obj is None:
+            return self
+
+        try:
+            return obj.__dict__[CHANGED_ATTRIBUTE][(self.name, self.language)]
+        except KeyError:
+            return get_translations(obj, self.language).get(self.name, None)
+
+    def __set__(self, obj, value):
+        clear_localized_values(obj)
+        obj.__dict__.setdefault(CHANGED_ATTRIBUTE, {})[(self.name, self.language)] = value
+
+def add_translation_attributes(cls, field):
+    """
+    Adds a :class:`TranslationDescriptor` to ``cls`` for ``field`` in each
+    language of the site.
+
+    :rtype: A :class:`list` with the names of the attributes.
+    """
+    names = []
+    for language in get_all_language_codes():
+        name = cls.localized_columns[(field.name, language)]
+        setattr(cls, name, TranslationDescriptor(field.name, language))
+        names.append(name)
+
+    post_save.connect(save_translations,
+        dispatch_uid='easymode.i18n.meta.storage.save_translations')
+    post_delete.connect(delete_translations,
+        dispatch_uid='easymode.i18n.meta.storage.delete_translations')
+    return names
+
+def get_needed_languages(language=None):
+    """
+    Returns the languages of the values that are read to find the value of a
+    localized field in ``language``, which is the current language by default.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    (fallback_languages, value_languages, name_languages) = get_language_chains(language)
+    needed = set(value_languages + name_languages)
+    needed.add(getattr(settings, 'MSGID_LANGUAGE', settings.LANGUAGE_CODE))
+    return [x for x in get_all_language_codes() if x in needed]
+
+def get_translation_values(model, pks, languages=None):
+    """
+    Reads the values of the localized fields of the objects of ``model``
+    with primary keys ``pks`` from the translation table, with one query.
+
+    :param languages: The languages that are read, by default all of them.
+    :rtype: A :class:`dict` with a :class:`dict` of values by (field, language)\
+        for each object that has values, by primary key as :class:`unicode`.
+    """
+    pks = [force_unicode(pk) for pk in pks]
+    if not pks:
+        return {}
+
+    rows = _get_translation_model().objects.filter(
+        content_type=_get_content_type(model), object_id__in=pks)
+    if languages is not None:
+        rows = rows.filter(language__in=languages)
+
+    result = {}
+    for (object_id, name, language, value) in rows.values_list('object_id', 'field', 'language', 'value'):
+        if name not in model.localized_fields:
+            # the field is not localized anymore.
+            continue
+        if value is not None:
+            value = getattr(model, name).to_python(value)
+        result.setdefault(object_id, {})[(name, language)] = value
+
+    return result
+
+def load_translations(objects, languages=None):
+    """
+    Loads the values of the localized fields of ``objects`` in ``languages``
+    from the translation table, with one query. All objects must be instances
+    of the same model.
+
+    :param languages: The languages that are loaded, by default all of them.
+    """
+    objects = [obj for obj in objects if obj.pk is not None]
+    if not objects:
+        return
+    if languages is None:
+        languages = get_all_language_codes()
+
+    values = get_translation_values(objects[0].__class__, [obj.pk for obj in objects], languages)
+    for obj in objects:
+        translations = obj.__dict__.setdefault(TRANSLATIONS_ATTRIBUTE, {})
+        for language in languages:
+            translations[language] = {}
+        for ((name, language), value) in values.get(force_unicode(obj.pk), {}).iteritems():
+            translations[language][name] = value
+        clear_localized_values(obj)
+
+def get_translations(obj, language):
+    """
+    Returns the values of the localized fields of ``obj`` in ``language``
+    that are stored in the translation table, by field name. When they are
+    not loaded yet, all languages that are not loaded are loaded.
+    """
+    translations = obj.__dict__.get(TRANSLATIONS_ATTRIBUTE, {})
+    if language not in translations and obj.pk is not None:
+        load_translations([obj], [x for x in get_all_language_codes() if x not in translations])
+        translations = obj.__dict__[TRANSLATIONS_ATTRIBUTE]
+    return translations.get(language, {})
+
+def save_translations(sender, instance, created, **kwargs):
+    "Saves the values that were assigned to the localized fields of ``instance``."
+    changed = instance.__dict__.pop(CHANGED_ATTRIBUTE, None)
+    if not changed:
+        return
+
+    Translation = _get_translation_model()
+    content_type = _get_content_type(instance.__class__)
+    object_id = force_unicode(instance.pk)
+
+    # the rows that exist already are loaded with one query, the values that
+    # have no row yet are inserted with one query.
+    if created:
+        rows = {}
+    else:
+        rows = dict(((row.field, row.language), row) for row in Translation.objects.filter(
+            content_type=content_type, object_id=object_id,
+            field__in=set(name for (name, language) in changed)).only('field', 'language', 'value'))
+
+    new_rows = []
+    deleted_pks = []
+    for ((name, language), value) in changed.iteritems():
+        row = rows.get((name, language), None)
+        if value is None:
+            if row is not None:
+                deleted_pks.append(row.pk)
+        elif row is None:
+            new_rows.append(Translation(content_type=content_type, object_id=object_id,
+                field=name, language=language, value=force_unicode(value)))
+        elif row.value != force_unicode(value):
+            Translation.objects.filter(pk=row.pk).update(value=force_unicode(value))
+
+    if new_rows:
+        Translation.objects.bulk_create(new_rows)
+    if deleted_pks:
+        Translation.objects.filter(pk__in=deleted_pks).delete()
+
+    # a new object has no other values, for an existing one only the languages
+    # that were loaded already are updated.
+    translations = instance.__dict__.setdefault(TRANSLATIONS_ATTRIBUTE, {})
+    if created:
+        for language in get_all_language_codes():
+            translations.setdefault(language, {})
+    for ((name, language), value) in changed.iteritems():
+        if language in translations:
+            translations[language][name] = value
+
+def delete_translations(sender, instance, **kwargs):
+    "Deletes the values of the localized fields of ``instance``."
+    if getattr(instance, 'translation_columns', None) is None:
+        return
+
+    _get_translation_model().objects.filter(content_type=_get_content_type(instance.__class__),
+        object_id=force_unicode(instance.pk)).delete()
@@ -7,22 +7,114 @@ from django.utils import translation
 
 from easymode.utils import first_match
 from easymode.utils.languagecode import get_real_fieldname
-from easymode.utils import first_match
+
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
 
 
 def valid_for_gettext(value):
     """Gettext acts weird when empty string is passes, and passing none would be even weirder"""
     return value not in (None, "")
     
+# (fallback_languages, value_languages, name_languages) by language, see
+# get_language_chains.
+_language_chains = {}
+
+# (value_columns, name_columns) by (class, field, language), see
+# get_column_chains.
+_column_chains = {}
+
+def _unique(items):
+    "Returns a tuple of ``items`` without duplicates, keeping their order."
+    result = []
+    for item in items:
+        if item not in result:
+            result.append(item)
+    return tuple(result)
+
+def get_language_chains(language=None):
+    """
+    Returns the languages that are tried, in order, when looking for the
+    value of a localized field in ``language``, which is the current
+    language by default. These are only computed once for each language.
+
+    :rtype: A tuple of (fallback_languages, value_languages, name_languages).\
+        ``fallback_languages`` are the ``settings.FALLBACK_LANGUAGES`` of\
+        ``language``, ``value_languages`` are tried by\
+        :func:`get_localized_property` and ``name_languages`` by\
+        :func:`get_localized_field_name`.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    chains = _language_chains.get(language, None)
+    if chains is None:
+        name_languages = (language, language[:2], settings.LANGUAGE_CODE)
+        if hasattr(settings, 'FALLBACK_LANGUAGES'):
+            fallback_languages = tuple(settings.FALLBACK_LANGUAGES.get(language, None)
+                or settings.FALLBACK_LANGUAGES.get(language[:2], []))
+            value_languages = (language,) + fallback_languages
+        else:
+            fallback_languages = ()
+            value_languages = name_languages
+
+        chains = (fallback_languages, _unique(value_languages), _unique(name_languages))
+        _language_chains[language] = chains
+
+    return chains
+
+def get_column_chains(context, field, language=None):
+    """
+    Returns the names of the attributes of ``context`` that are tried, in
+    order, when looking for the value of ``field`` in ``language``. These are
+    only computed once for each class, field and language.
+
+    When ``context`` is a model instance, the names of attributes that are
+    not a field of the model, or stored in the translation table, are left
+    out.
+
+    :rtype: A tuple of (value_columns, name_columns), which are the\
+        attributes tried by :func:`get_localized_property` and\
+        :func:`get_localized_field_name`.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    key = (context.__class__, field, language)
+    chains = _column_chains.get(key, None)
+    if chains is None:
+        (fallback_languages, value_languages, name_languages) = get_language_chains(language)
+        value_columns = _unique(get_localized_column(context, field, x) for x in value_languages)
+        name_columns = _unique(get_localized_column(context, field, x) for x in name_languages)
+
+        opts = getattr(context, '_meta', None)
+        if opts is not None:
+            attnames = set(model_field.attname for model_field in opts.fields)
+            attnames.update(getattr(context, 'translation_columns', None) or ())
+            value_columns = tuple(x for x in value_columns if x in attnames)
+            name_columns = tuple(x for x in name_columns if x in attnames)
+
+        chains = (value_columns, name_columns)
+        _column_chains[key] = chains
+
+    return chains
+
 def get_fallback_languages():
     """Retrieve the fallback languages from the settings.py"""
-    lang = translation.get_language()
-    fallback_list = settings.FALLBACK_LANGUAGES.get(lang, None)
-    if fallback_list:
-        return fallback_list
+    return get_language_chains()[0]
 
-    return settings.FALLBACK_LANGUAGES.get(lang[:2], [])
 
+def get_localized_column(context, field, language):
+    """
+    Returns the real name of ``field`` in ``language``, from the
+    ``localized_columns`` table of ``context`` if it has one.
+    """
+    columns = getattr(context, 'localized_columns', None)
+    if columns is None:
+        return get_real_fieldname(field, language)
+    return columns[(field, language)]
 
 def get_localized_property(context, field=None, language=None):
     '''
@@ -31,43 +123,35 @@ def get_localized_property(context, field=None, language=None):
     the value in the default language will be returned.
     '''
     if language:
-        return getattr(context, get_real_fieldname(field, language))
-    
-    if hasattr(settings, 'FALLBACK_LANGUAGES'):
-        attrs = [translation.get_language()]
-        attrs += get_fallback_languages()
-    else:
-        attrs = [
-            translation.get_language(),
-            translation.get_language()[:2],
-            settings.LANGUAGE_CODE, 
-        ]
-    
-    def predicate(x):
-        value = getattr(context, get_real_fieldname(field, x), None)
-        return value if valid_for_gettext(value) else None
+        return getattr(context, get_localized_column(context, field, language))
 
-    return first_match(predicate, attrs)
+    for field_name in get_column_chains(context, field)[0]:
+        value = getattr(context, field_name, None)
+        if valid_for_gettext(value):
+            return value
+
+    return None
 
 
 def get_localized_field_name(context, field):
     """Get the name of the localized field"""
-    attrs = [
-             translation.get_language(), 
-             translation.get_language()[:2], 
-             settings.LANGUAGE_CODE
-            ]
-            
-    def predicate(x):
-        field_name = get_real_fieldname(field, x)
+    for field_name in get_column_chains(context, field)[1]:
         if hasattr(context, field_name):
             return field_name
-        return None
 
-    return first_match(predicate, attrs)
+    return None
 
 def get_field_from_model_by_name(model_class, field_name):
     """
     Get a field by name from a model class without messing with the app cache.
     """
     return first_match(lambda x: x if x.name == field_name else None, model_class._meta.fields)
+
+def _reset_chains(sender, setting, **kwargs):
+    "The languages that are tried depend on these settings."
+    if setting in ('LANGUAGES', 'LANGUAGE_CODE', 'FALLBACK_LANGUAGES'):
+        _language_chains.clear()
+        _column_chains.clear()
+
+setting_changed.connect(_reset_chains,
+    dispatch_uid='easymode.i18n.meta.utils._reset_chains')
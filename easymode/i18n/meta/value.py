@@ -1,10 +1,13 @@
 """
 Value objects used by easymode's i18n.meta package.
 """
-class GettextVO:
+class GettextVO(object):
     """
     A value object that contains information about the origin
     of the value in question.
+
+    Localized fields only return values with this information when it is
+    asked for, see :func:`~easymode.i18n.meta.fields.get_localized_values`.
     
     .. attribute:: standin_value_is_from_database
 
@@ -27,10 +30,18 @@ class GettextVO:
         the value as it is stored in the database
     
     """
-    
+    __slots__ = ('standin_value_is_from_database', 'msgid', 'msg', 'fallback', 'stored_value')
+
     def __init__(self):
         self.standin_value_is_from_database = False
         self.msgid = None
         self.msg = None
         self.fallback = None
         self.stored_value = None
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for (name, value) in state.iteritems():
+            setattr(self, name, value)
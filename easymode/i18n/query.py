@@ -0,0 +1,236 @@
+"""
+Contains a queryset that can read the values of the localized fields of many
+objects at once.
+
+Reading a localized field of an object finds the value in the database, the
+gettext catalogs and the fallback languages, see
+:class:`~easymode.i18n.meta.fields.DefaultFieldDescriptor`. For a list of
+objects :func:`localized_values` does the same for all objects, but it only
+loads the columns that are needed from the database and does not create
+model instances.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models.query import QuerySet
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+from django.utils import translation
+from django.utils.encoding import force_unicode
+
+from easymode.i18n.meta.storage import get_needed_languages, \
+    get_translation_values, load_translations
+from easymode.i18n.meta.utils import get_column_chains
+
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
+
+__all__ = ('LocalizedQuerySet', 'localized_values', 'get_inactive_columns')
+
+# the types of the rows that are resolved by localized_values, by model.
+_row_types = {}
+
+# the columns returned by get_inactive_columns, by (model, language).
+_inactive_columns = {}
+
+# the number of objects for which the values in the translation table are
+# loaded at once.
+CHUNK_SIZE = GET_ITERATOR_CHUNK_SIZE
+
+def _get_row_type(model):
+    """
+    Returns a type whose instances can hold a row of ``model``, and which can
+    be passed to :meth:`~easymode.i18n.meta.fields.DefaultFieldDescriptor.lookup`
+    instead of a model instance.
+    """
+    row_type = _row_types.get(model, None)
+    if row_type is None:
+        row_type = type('%sLocalizedValues' % model.__name__, (object,), {
+            '_meta': model._meta,
+            'localized_columns': model.localized_columns,
+            'translation_columns': getattr(model, 'translation_columns', None),
+        })
+        _row_types[model] = row_type
+    return row_type
+
+def localized_values(queryset, fields=None, language=None):
+    """
+    Returns the values of the localized fields of all objects in
+    ``queryset``, as they would be returned by reading the fields of each
+    object.
+
+    Only the columns of ``language`` and the languages that are tried when a
+    value is not found are selected from the database.
+
+    usage::
+
+        for values in localized_values(Foo.objects.all(), ['title', 'body']):
+            print values['pk'], values['title']
+
+    :param queryset: A queryset of a model decorated with :class:`~easymode.i18n.decorators.I18n`.
+    :param fields: The names of the localized fields, by default all of them.
+    :param language: The language of the values, by default the current language.
+    :rtype: A :class:`list` with a :class:`dict` for each object, which\
+        contains the value of each field by name and the primary key as ``pk``.
+    """
+    model = queryset.model
+    if fields is None:
+        fields = model.localized_fields
+    if language is None:
+        language = translation.get_language()
+
+    row_type = _get_row_type(model)
+    msgid_language = getattr(settings, 'MSGID_LANGUAGE', settings.LANGUAGE_CODE)
+    descriptors = [(name, getattr(model, name)) for name in fields]
+
+    # these are the columns read by DefaultFieldDescriptor.lookup
+    columns = set()
+    for name in fields:
+        columns.add(model.localized_columns[(name, language)])
+        columns.add(model.localized_columns[(name, msgid_language)])
+        columns.update(get_column_chains(row_type(), name, language)[0])
+
+    pk_name = model._meta.pk.attname
+    if row_type.translation_columns is None:
+        rows = queryset.values(pk_name, *columns)
+    else:
+        rows = _translation_rows(queryset, columns, language)
+
+    result = []
+    with translation.override(language):
+        for row in rows:
+            obj = row_type()
+            obj.__dict__ = row
+
+            values = {'pk': row[pk_name]}
+            for (name, descriptor) in descriptors:
+                values[name] = descriptor.lookup(obj, language)
+            result.append(values)
+
+    return result
+
+def _translation_rows(queryset, columns, language):
+    """
+    Returns the rows of :func:`localized_values` for a model that stores it's
+    localized fields in the translation table.
+    """
+    model = queryset.model
+    pk_name = model._meta.pk.attname
+    pks = list(queryset.values_list(pk_name, flat=True))
+    values = get_translation_values(model, pks, get_needed_languages(language))
+
+    rows = []
+    for pk in pks:
+        row = dict.fromkeys(columns)
+        for ((name, value_language), value) in values.get(force_unicode(pk), {}).iteritems():
+            column = model.localized_columns[(name, value_language)]
+            if column in row:
+                row[column] = value
+        row[pk_name] = pk
+        rows.append(row)
+
+    return rows
+
+def get_inactive_columns(model, language=None):
+    """
+    Returns the names of the localized columns of ``model`` that are not
+    needed to read it's localized fields in ``language``, which is the
+    current language by default. These are the columns of all languages
+    except ``language``, the msgid language and the languages that are
+    tried when a value is missing.
+
+    :rtype: A :class:`frozenset` of field names.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    key = (model, language)
+    columns = _inactive_columns.get(key, None)
+    if columns is None:
+        msgid_language = getattr(settings, 'MSGID_LANGUAGE', settings.LANGUAGE_CODE)
+        row = _get_row_type(model)()
+
+        needed = set()
+        for name in model.localized_fields:
+            needed.add(model.localized_columns[(name, language)])
+            needed.add(model.localized_columns[(name, msgid_language)])
+            needed.update(get_column_chains(row, name, language)[0])
+
+        columns = frozenset(field.attname for field in model._meta.fields
+            if getattr(field, 'original_fieldname', None) in model.localized_fields
+            and field.attname not in needed)
+        _inactive_columns[key] = columns
+
+    return columns
+
+class LocalizedQuerySet(QuerySet):
+    """
+    Adds a :meth:`localized_values` method to the queryset. Models decorated
+    with :class:`~easymode.i18n.decorators.I18n` use it when they do not have
+    a custom manager.
+
+    When the model was decorated with ``I18n(..., defer_languages=True)``,
+    the columns of the languages that are not needed are deferred
+    automatically when the queryset is evaluated, see :meth:`for_language`.
+
+    When the model stores it's localized fields in the translation table, the
+    values of the objects are loaded with one query for each :data:`CHUNK_SIZE`
+    objects when the queryset is evaluated, see :mod:`easymode.i18n.meta.storage`.
+    """
+
+    def for_language(self, language=None):
+        """
+        Returns a queryset that does not load the localized columns that are
+        not needed to read the localized fields in ``language``, which is
+        the current language by default. See :func:`get_inactive_columns`.
+
+        The columns are still loaded when they are used, with one query for
+        each object.
+        """
+        return self.defer(*get_inactive_columns(self.model, language))
+
+    def iterator(self):
+        (field_names, defer) = self.query.deferred_loading
+        if getattr(self.model, 'defer_languages', False) and defer:
+            objects = super(LocalizedQuerySet, self.for_language()).iterator()
+        else:
+            objects = super(LocalizedQuerySet, self).iterator()
+
+        if getattr(self.model, 'translation_columns', None) is not None:
+            return _load_translations_in_chunks(objects)
+        return objects
+
+    def localized_values(self, *fields, **kwargs):
+        """
+        Returns the values of the localized ``fields`` of all objects,
+        see :func:`easymode.i18n.query.localized_values`.
+
+        usage::
+
+            Foo.objects.filter(published=True).localized_values('title', 'body', language='de')
+        """
+        return localized_values(self, fields or None, kwargs.pop('language', None))
+
+def _load_translations_in_chunks(objects):
+    """
+    Yields ``objects``, after loading their values in the translation table
+    with one query for each :data:`CHUNK_SIZE` objects.
+    """
+    languages = get_needed_languages()
+    while True:
+        chunk = list(islice(objects, CHUNK_SIZE))
+        if not chunk:
+            break
+        load_translations(chunk, languages)
+        for obj in chunk:
+            yield obj
+
+def _reset_inactive_columns(sender, setting, **kwargs):
+    "The columns that are needed depend on these settings."
+    if setting in ('LANGUAGES', 'LANGUAGE_CODE', 'MSGID_LANGUAGE', 'FALLBACK_LANGUAGES'):
+        _inactive_columns.clear()
+
+setting_changed.connect(_reset_inactive_columns,
+    dispatch_uid='easymode.i18n.query._reset_inactive_columns')
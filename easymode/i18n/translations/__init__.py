@@ -0,0 +1,7 @@
+"""
+The table that holds the values of the localized fields of models decorated
+with ``I18n(..., storage='table')``, see :mod:`easymode.i18n.meta.storage`.
+
+Add ``'easymode.i18n.translations'`` to the ``INSTALLED_APPS`` to use it, and
+run ``syncdb`` to create the table.
+"""
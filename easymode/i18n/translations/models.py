@@ -0,0 +1,21 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class Translation(models.Model):
+    """
+    Holds the value of a localized field of a model decorated with
+    ``I18n(..., storage='table')``, in one language. See
+    :mod:`easymode.i18n.meta.storage`.
+    """
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.CharField(max_length=255)
+    field = models.CharField(max_length=255)
+    language = models.CharField(max_length=15, db_index=True)
+    value = models.TextField(null=True)
+
+    class Meta:
+        unique_together = (('content_type', 'object_id', 'field', 'language'),)
+
+    def __unicode__(self):
+        return u"%s %s %s (%s)" % (self.content_type, self.object_id, self.field, self.language)
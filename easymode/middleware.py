@@ -1,75 +1,135 @@
 import re
 import time
+from functools import wraps
 
 from django.conf import settings
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.middleware.locale import LocaleMiddleware
 from django.utils import translation
+from django.utils.decorators import available_attrs
+from django.utils.encoding import smart_str
 from django.utils.http import cookie_date
 
 from easymode.utils.languagecode import get_short_language_codes,\
-    get_language_code_from_shorthand,\
+    split_language_prefix,\
     get_shorthand_from_language_code as language_as_slug
 
 
 USE_SHORT_LANGUAGE_CODES = getattr(settings, 'USE_SHORT_LANGUAGE_CODES', False)
 
+# the key of the language in the session, which django 1.7 renamed.
+LANGUAGE_SESSION_KEY = getattr(translation, 'LANGUAGE_SESSION_KEY', 'django_language')
+
 ################################################################################
 # Compiled regular expressions
 ################################################################################
 
-MATCH_LANGUAGE_CODE = re.compile(
-    r"^/(%s)/.*" % "|".join(map(lambda l: l[0], settings.LANGUAGES)))
-MATCH_SHORT_LANGUAGE_CODE = re.compile(
-    r"^/(%s)/.*" % "|".join(get_short_language_codes()))
-
 if USE_SHORT_LANGUAGE_CODES:
-    HREF_REGEX = re.compile(
-        ur'<a([^>]+)href="/(?!(%s|%s|%s))([^"]*)"([^>]*)>' % (
-            "|".join(map(lambda l: l + "/" , get_short_language_codes())), 
-            settings.MEDIA_URL[1:], 
-            settings.ADMIN_MEDIA_PREFIX[1:]
-        )
-    )
-    FORM_REGEX = re.compile(
-        ur'<form([^>]+)action="/(?!(%s|%s|%s))([^"]*)"([^>]*)>' % (
-            "|".join(map(lambda l: l + "/" , get_short_language_codes())),
-             settings.MEDIA_URL[1:],
-             settings.ADMIN_MEDIA_PREFIX[1:]
-        )
-    )
+    URL_LANGUAGE_CODES = get_short_language_codes()
 else:
-    HREF_REGEX = re.compile(
-        ur'<a([^>]+)href="/(?!(%s|%s|%s))([^"]*)"([^>]*)>' % (
-            "|".join(map(lambda l: l[0] + "/" , settings.LANGUAGES)), 
-            settings.MEDIA_URL[1:], 
-            settings.ADMIN_MEDIA_PREFIX[1:]
-        )
-    )
-    FORM_REGEX = re.compile(
-        ur'<form([^>]+)action="/(?!(%s|%s|%s))([^"]*)"([^>]*)>' % (
-            "|".join(map(lambda l: l[0] + "/" , settings.LANGUAGES)),
-             settings.MEDIA_URL[1:],
-             settings.ADMIN_MEDIA_PREFIX[1:]
-        )
-    )
+    URL_LANGUAGE_CODES = map(lambda l: l[0], settings.LANGUAGES)
+
+# the urls that are not localised, because they start with a language code
+# or one of the media prefixes.
+UNLOCALISED_URLS = ur'%s|%s|%s' % (
+    "|".join(map(lambda l: l + "/" , URL_LANGUAGE_CODES)),
+    settings.MEDIA_URL[1:],
+    settings.ADMIN_MEDIA_PREFIX[1:]
+)
+
+# matches the start of the href of an anchor or the action of a form, up to
+# the first slash of the url, when the url should be localised. The content
+# is not decoded, so the pattern is a byte string.
+URL_REGEX = re.compile(smart_str(
+    ur'(<a[^>]+href="/|<form[^>]+action="/)(?!(%s))(?=[^"]*"[^>]*>)' % UNLOCALISED_URLS
+))
+
+# matches an url that should be localised.
+LOCALISABLE_URL_REGEX = re.compile(ur'^/(?!(%s))' % UNLOCALISED_URLS)
 
 ################################################################################
 # helper functions
 ################################################################################
 
+def localise_url(url, language=None):
+    """
+    Inserts ``language``, which is the current language by default, as a slug
+    in ``url``, like :class:`LocaliseUrlsMiddleware` does for the urls in a
+    response. Urls that are not absolute paths, that already start with a
+    language code, or that point to media are returned as they are.
+
+    :param url: An url.
+    :param language: A language code.
+    :rtype: The localised url.
+    """
+    if language is None:
+        language = translation.get_language()
+
+    if LOCALISABLE_URL_REGEX.match(url):
+        return u"/%s%s" % (language_as_slug(language), url)
+    return url
+
+def localise_urls(content, language):
+    """
+    Inserts ``language`` as a slug in the urls of all anchors and forms in
+    ``content`` that do not have a language code yet.
+
+    :param content: The content of a response as a byte string.
+    :param language: A language code.
+    :rtype: The localised content as a byte string.
+    """
+    return URL_REGEX.sub(r'\1%s/' % smart_str(language_as_slug(language)), content)
+
+def localise_urls_in_chunks(chunks, language):
+    """
+    Like :func:`localise_urls`, but for content that is produced in chunks,
+    like the content of a streaming response. A tag that is split over two
+    chunks is localised when the second chunk arrives.
+
+    :rtype: A generator of the localised chunks.
+    """
+    pending = ''
+    for chunk in chunks:
+        pending += chunk
+        # everything before the first tag that is not closed yet is complete.
+        end = pending.find('<', pending.rfind('>') + 1)
+        if end == -1:
+            end = len(pending)
+        if end:
+            yield localise_urls(pending[:end], language)
+            pending = pending[end:]
+
+    if pending:
+        yield localise_urls(pending, language)
+
 def has_lang_prefix(path):
-    if USE_SHORT_LANGUAGE_CODES:
-        check = MATCH_SHORT_LANGUAGE_CODE.match(path)
-        
-        if check is not None:
-            return get_language_code_from_shorthand(check.group(1))
-    else:
-        check = MATCH_LANGUAGE_CODE.match(path)
-        if check is not None:
-            return check.group(1)
-        
-        return False
+    """
+    Returns the language code ``path`` starts with, or ``False`` if it does
+    not start with a language code, see
+    :func:`~easymode.utils.languagecode.split_language_prefix`.
+    """
+    return split_language_prefix(path)[0] or False
+
+def urls_localised(view_func):
+    """
+    Marks the responses of ``view_func`` as localised, so
+    :class:`LocaliseUrlsMiddleware` does not have to search their content for
+    urls. Use it for views that localise all urls while rendering, with the
+    ``localise_url`` template filter or the ``easymode:localise-url`` xslt
+    function::
+
+        @urls_localised
+        def index(request):
+            return render_to_response('index.html')
+
+    A response can also be marked by setting it's ``urls_localised``
+    attribute to ``True``.
+    """
+    def wrapped_view(*args, **kwargs):
+        response = view_func(*args, **kwargs)
+        response.urls_localised = True
+        return response
+    return wraps(view_func, assigned=available_attrs(view_func))(wrapped_view)
 
 ################################################################################
 # middlewares
@@ -118,6 +178,12 @@ class LocaleFromUrlMiddleWare(LocaleMiddleware):
     
     Also we don't use the accept language to determine the language of the page
     anymore, so the Accept-Language is nolonger considered for the vary headers.
+
+    The language is stored in the session, or in a cookie when there is no
+    session, when it is different from the stored language. When
+    ``settings.LANGUAGE_FROM_URL_ONLY`` is ``True``, the session and cookies
+    are not touched at all, so pages can be cached without a session being
+    saved on each request.
     """
     def process_request(self, request):
         language = has_lang_prefix(request.path_info)
@@ -125,10 +191,15 @@ class LocaleFromUrlMiddleWare(LocaleMiddleware):
         if not language:
             language = settings.LANGUAGE_CODE
         
-        if hasattr(request, "session"):
-            request.session["django_language"] = language
-        else:
-            request.set_cookie("django_language", language)
+        if not getattr(settings, 'LANGUAGE_FROM_URL_ONLY', False):
+            if hasattr(request, "session"):
+                # assigning the language marks the session as modified, even
+                # when it is the same.
+                if request.session.get(LANGUAGE_SESSION_KEY, None) != language:
+                    request.session[LANGUAGE_SESSION_KEY] = language
+            elif getattr(request, 'COOKIES', {}).get(settings.LANGUAGE_COOKIE_NAME, None) != language:
+                # the cookie is set on the response.
+                request.language_cookie = language
         
         translation.activate(language)
         request.LANGUAGE_CODE = translation.get_language()
@@ -136,6 +207,9 @@ class LocaleFromUrlMiddleWare(LocaleMiddleware):
     def process_response(self, request, response):
         if 'Content-Language' not in response:
             response['Content-Language'] = translation.get_language()
+        language_cookie = getattr(request, 'language_cookie', None)
+        if language_cookie is not None:
+            response.set_cookie(settings.LANGUAGE_COOKIE_NAME, language_cookie)
         translation.deactivate()
         return response
     
@@ -144,6 +218,11 @@ class LocaliseUrlsMiddleware(object):
     """
     This middleware replaces all anchor tags with localised versions, ugly
     but it works.
+
+    The urls of anchors and forms are localised in one pass over the content,
+    see :func:`localise_urls`. Streaming responses are localised chunk by
+    chunk while they are sent. Responses of views that localise the urls while
+    rendering can skip this, see :func:`urls_localised`.
     
     Don't put any vary header for the Accept-Language because the language does
     not depend on the vary header, the language is in the url.
@@ -156,15 +235,15 @@ class LocaliseUrlsMiddleware(object):
         if not path.startswith(settings.MEDIA_URL) and \
             not path.startswith(settings.ADMIN_MEDIA_PREFIX) and \
             response.status_code == 200 and \
+            not getattr(response, 'urls_localised', False) and \
             response._headers['content-type'][1].split(';')[0] == "text/html":
-                
-            response.content = HREF_REGEX.sub(
-                ur'<a\1href="/%s/\3"\4>' % language_as_slug(request.LANGUAGE_CODE), 
-                response.content.decode('utf-8'))
-            response.content = FORM_REGEX.sub(
-                ur'<form\1action="/%s/\3"\4>' % language_as_slug(request.LANGUAGE_CODE), 
-                response.content.decode('utf-8'))
-                
+
+            if getattr(response, 'streaming', False):
+                response.streaming_content = localise_urls_in_chunks(
+                    response.streaming_content, request.LANGUAGE_CODE)
+            else:
+                response.content = localise_urls(response.content, request.LANGUAGE_CODE)
+
         if (response.status_code == 301 or response.status_code == 302 ):
             location = response._headers['location']
             prefix = has_lang_prefix(location[1])
@@ -1,3 +1,4 @@
+from django.core.urlresolvers import reverse
 from django.template.defaultfilters import stringfilter
 from django import template
 
@@ -32,4 +33,23 @@ def fix_shorthand(language_code):
     """
     return languagecode.get_shorthand_from_language_code(language_code)
 
+@register.filter
+@stringfilter
+def localise_url(url, language=None):
+    """
+    Inserts the language code in an url, the way
+    :class:`~easymode.middleware.LocaliseUrlsMiddleware` does it, but while
+    rendering. Urls that already have a language code are not changed. The
+    current language is used, unless another language is passed.
+    """
+    # imported here, because easymode.middleware needs settings that sites
+    # which do not use it might not have.
+    from easymode.middleware import localise_url
+    return localise_url(url, language)
 
+@register.simple_tag
+def localised_url(view_name, *args, **kwargs):
+    """
+    Works like the ``url`` tag, but the url is localised by :func:`localise_url`.
+    """
+    return localise_url(reverse(view_name, args=args, kwargs=kwargs))
@@ -14,8 +14,8 @@ from easymode.utils import first_match, bases_walker, url_add_params
 from easymode.utils.languagecode import get_language_codes,\
     get_language_codes_as_disjunction, get_language_code_from_shorthand,\
     localize_fieldnames, get_real_fieldname, strip_language_code,\
-    get_short_language_codes
-from easymode.utils.standin import standin_for
+    get_short_language_codes, LocalizedColumns, LanguageRegistry
+from easymode.utils.standin import standin_for, standin_with_attributes
 
 # check if some required settings are fulfilled
 if 'de' not in get_language_codes():
@@ -55,9 +55,12 @@ __test__ = {
     "test_strip_language_code" : strip_language_code,
     "test_get_real_fieldname" : get_real_fieldname,
     "test_localize_fieldnames" : localize_fieldnames,
+    "test_localized_columns" : LocalizedColumns,
+    "test_language_registry" : LanguageRegistry,
     "test_get_language_codes_as_disjunction" : get_language_codes_as_disjunction,
     "test_first_match" : first_match,
     "test_bases_walker" : bases_walker,
     "test_standin_for": standin_for,
+    "test_standin_with_attributes": standin_with_attributes,
     'test_url_add_params' : url_add_params,
 }
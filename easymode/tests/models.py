@@ -79,6 +79,17 @@ class TestL10nModel(models.Model):
         return u"%s%s" % (self.__class__.__name__, self.pk)
 
 
+@I18n('title', 'price', storage='table')
+class TranslationTableModel(models.Model):
+    "Used in test_translation_table (easymode.tests.testcases.testi18n.Testi18n)"
+    title = models.CharField(max_length=200)
+    price = models.FloatField()
+    code = models.CharField(max_length=20)
+
+    def __unicode__(self):
+        return u"%s%s" % (self.__class__.__name__, self.pk)
+
+
 class GenericRelatedModel(models.Model):
     "Used in test_generic_relations_also_work (easymode.tests.testcases.testtoxml.RecursiveSerializerTest)"
 
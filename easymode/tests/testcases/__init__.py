@@ -26,6 +26,7 @@ def initdb(cls):
         self.settingsManager = TestSettingsManager()
         self.settingsManager.set(INSTALLED_APPS=settings.INSTALLED_APPS + (
             'easymode',
+            'easymode.i18n.translations',
             'easymode.tests',
             ),
         )
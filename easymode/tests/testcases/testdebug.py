@@ -0,0 +1,127 @@
+import socket
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory
+from django.utils.decorators import decorator_from_middleware
+
+from easymode.debug import metrics
+from easymode.debug import middleware
+from easymode.tests.testcases import initdb
+
+
+__all__ = ('TestCacheMetrics',)
+
+@decorator_from_middleware(middleware.DebugCacheMiddleware)
+def debug_cache_view(request):
+    return HttpResponse('cached')
+
+class CountingCache(object):
+    "Counts the operations on the cache."
+    def __init__(self, cache):
+        self.cache = cache
+        self.operations = []
+
+    def get(self, *args, **kwargs):
+        self.operations.append('get')
+        return self.cache.get(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        self.operations.append('set')
+        return self.cache.set(*args, **kwargs)
+
+@initdb
+class TestCacheMetrics(TestCase):
+    "Test the metrics of the debug cache middlewares"
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        middleware.cache = cache
+        self.settingsManager.revert()
+
+    def test_memory_sink(self):
+        "The MemorySink should count the hits, misses and stores and measure the latencies and keys"
+
+        self.settingsManager.set(CACHE_METRICS_SINK='easymode.debug.metrics.MemorySink')
+        sink = metrics.get_sink()
+        self.assertTrue(sink is metrics.get_sink())
+
+        for i in range(3):
+            request = self.factory.get('/metrics/')
+            request.LANGUAGE_CODE = 'de'
+            debug_cache_view(request)
+
+        snapshot = sink.snapshot()
+        counts = dict(((x['event'], x['pattern'], x['language']), x['count']) for x in snapshot['counters'])
+        self.assertEqual(counts, {
+            ('miss', metrics.UNRESOLVED, 'de'): 1,
+            ('store', metrics.UNRESOLVED, 'de'): 1,
+            ('hit', metrics.UNRESOLVED, 'de'): 2,
+        })
+
+        latencies = snapshot['latencies']
+        self.assertEqual(sorted(latencies.keys()), ['get', 'get_headers', 'set', 'set_headers'])
+        self.assertEqual(sum(count for (bound, count) in latencies['get_headers']), 3)
+        self.assertEqual(latencies['get'][-1][0], None)
+
+        self.assertEqual(snapshot['key_sizes']['count'], 3)
+        self.assertTrue(snapshot['key_sizes']['min'] > 0)
+        self.assertEqual(snapshot['key_sizes']['min'], snapshot['key_sizes']['max'])
+
+        sink.reset()
+        self.assertEqual(sink.snapshot()['counters'], [])
+
+    def test_url_patterns(self):
+        "The url pattern should be taken from the resolved request, and from the cached page on a hit"
+
+        self.settingsManager.set(CACHE_METRICS_SINK='easymode.debug.metrics.MemorySink')
+        sink = metrics.get_sink()
+        sink.reset()
+
+        request = self.factory.get('/metrics/')
+        request.LANGUAGE_CODE = 'de'
+        request.resolver_match = type('ResolverMatchMock', tuple(), {'url_name':'metrics', 'func':debug_cache_view})
+        debug_cache_view(request)
+
+        # a hit is served before the path is resolved.
+        request = self.factory.get('/metrics/')
+        request.LANGUAGE_CODE = 'de'
+        debug_cache_view(request)
+
+        counts = dict(((x['event'], x['pattern']), x['count']) for x in sink.snapshot()['counters'])
+        self.assertEqual(counts, {('miss', 'metrics'): 1, ('store', 'metrics'): 1, ('hit', 'metrics'): 1})
+
+    def test_no_extra_cache_operations(self):
+        "The debug middlewares should not use the cache more often than django's cache middlewares"
+
+        counting_cache = middleware.cache = CountingCache(cache)
+        request = self.factory.get('/metrics/')
+        debug_cache_view(request)
+
+        # the header list is stored by learn_cache_key in django's cache.
+        self.assertEqual(counting_cache.operations, ['get', 'set'])
+
+        counting_cache.operations = []
+        self.settingsManager.set(CACHE_METRICS_SINK='easymode.debug.metrics.MemorySink')
+        debug_cache_view(self.factory.get('/metrics/'))
+        self.assertEqual(counting_cache.operations, ['get', 'get'])
+
+    def test_statsd_sink(self):
+        "The StatsdSink should send the metrics over udp"
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        try:
+            sink = metrics.StatsdSink(port=server.getsockname()[1], prefix='site')
+            sink.count('hit', 'app.views.page', 'en-us')
+            self.assertEqual(server.recv(512), 'site.hit.app_views_page.en-us:1|c')
+            sink.timing('get', 1.5)
+            self.assertEqual(server.recv(512), 'site.latency.get:1.500|ms')
+            sink.key_size(80)
+            self.assertEqual(server.recv(512), 'site.key_size:80|h')
+        finally:
+            server.close()
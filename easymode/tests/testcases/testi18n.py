@@ -8,17 +8,22 @@ import warnings
 from os.path import join, isdir
 
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.core.urlresolvers import reverse
 from django.db import IntegrityError
 from django.db.models.signals import post_save
 from django.test import TestCase
 from django.utils import translation
+from django.utils.safestring import SafeData, mark_safe
 from django.utils.translation import trans_real
 
 from easymode.tree import xml as tree
 from easymode.i18n import gettext
 from easymode.i18n.gettext import MakeModelMessages
-from easymode.i18n.meta import utils as meta_utils
+from easymode.i18n.meta import catalogs, utils as meta_utils
+from easymode.i18n import query
+from easymode.i18n.meta.fields import get_localized_values
+from easymode.i18n.translations.models import Translation
 from easymode.tests import models
 from easymode.tests.testcases import initdb
 from easymode.tests.testutils.scriptutil import ffindgrep
@@ -181,6 +186,177 @@ class Testi18n(TestCase):
         field = meta_utils.get_localized_field_name(self, 'title')
         assert(field == 'title_en')
             
+    def test_localized_columns(self):
+        """The real names of the localized fields should be computed only once"""
+        columns = models.TestModel.localized_columns
+        self.assertEqual(columns[('charfield', 'en-us')], 'charfield_en_us')
+        self.assertEqual(columns[('charfield', 'en-gb')], 'charfield_en_gb')
+        self.assertTrue(columns[('charfield', 'de')] is columns[('charfield', 'de')])
+        self.assertRaises(TypeError, columns.__setitem__, ('charfield', 'de'), 'charfield')
+
+    def test_column_chains(self):
+        """The columns that are tried should only include fields of the model"""
+        t = models.TestModel.objects.get(charfield_en='Hoi Ik ben de root node')
+        (value_columns, name_columns) = meta_utils.get_column_chains(t, 'charfield', 'de')
+        self.assertEqual(value_columns, ('charfield_de', 'charfield_en_us'))
+        self.assertEqual(name_columns, ('charfield_de', 'charfield_en'))
+
+        self.settingsManager.set(FALLBACK_LANGUAGES={'de': ['en']})
+        (value_columns, name_columns) = meta_utils.get_column_chains(t, 'charfield', 'de')
+        self.assertEqual(value_columns, ('charfield_de', 'charfield_en'))
+
+    def test_get_localized_values(self):
+        """All localized fields should be looked up at once"""
+        i = self.setup_l10n_model()
+        values = get_localized_values(i)
+        self.assertEqual(sorted(values.keys()), sorted(i.localized_fields))
+        self.assertEqual(values['title'], i.title)
+        self.assertTrue(values['description'] is i.description)
+
+    def test_provenance(self):
+        """Values from the database should only tell where they came from when asked"""
+        i = self.setup_l10n_model()
+        self.assertFalse(hasattr(i.title, 'standin_value_is_from_database'))
+
+        values = get_localized_values(i, provenance=True)
+        self.assertEqual(values['title'], i.title)
+        self.assertTrue(values['title'].standin_value_is_from_database)
+        self.assertEqual(values['title'].msgid, i.title)
+
+    def test_catalog_cache(self):
+        """Lookups in the catalogs should be remembered until a catalog changes"""
+        catalogs.clear()
+        msgid = u'Ik ben nog niet vertaald'
+        self.assertEqual(catalogs.ugettext(msgid, 'de'), msgid)
+        self.assertEqual(catalogs._entries.values(), [None])
+
+        catalog = trans_real.translation('de')
+        catalog._catalog[msgid] = u'Ich bin jetzt übersetzt'
+        try:
+            self.assertEqual(catalogs.ugettext(msgid, 'de'), u'Ich bin jetzt übersetzt')
+        finally:
+            del catalog._catalog[msgid]
+
+        catalogs.clear()
+        self.assertFalse(catalogs._entries)
+
+    def test_catalog_cache_normalizes_msgids(self):
+        """Lookups in the catalogs should normalize line endings and keep safe text safe"""
+        catalog = trans_real.translation('de')
+        catalog._catalog[u'eins\nzwei'] = u'one\ntwo'
+        try:
+            self.assertEqual(catalogs.ugettext(u'eins\r\nzwei', 'de'), u'one\ntwo')
+            self.assertEqual(catalogs.ugettext(u'eins\rzwei', 'de'), u'one\ntwo')
+            # the second lookup is answered by the cache.
+            for i in range(2):
+                self.assertEqual(catalogs.ugettext(u'drei\r\nvier', 'de'), u'drei\nvier')
+            self.assertTrue(isinstance(catalogs.ugettext(mark_safe(u'eins\nzwei'), 'de'), SafeData))
+            self.assertFalse(isinstance(catalogs.ugettext(u'eins\nzwei', 'de'), SafeData))
+            self.assertTrue(isinstance(catalogs.ugettext(mark_safe(u'<b>drei</b>'), 'de'), SafeData))
+        finally:
+            del catalog._catalog[u'eins\nzwei']
+            catalogs.clear()
+
+    def test_localized_values_of_queryset(self):
+        """The localized values of a queryset should be the same as the values of the objects"""
+        i = self.setup_l10n_model()
+        i.title_de = 'Ich bin der grosse Muftie'
+        i.save()
+
+        for language in ('en', 'de', 'en-us'):
+            translation.activate(language)
+            expected = [dict(pk=obj.pk, title=obj.title, description=obj.description)
+                for obj in models.TestL10nModel.objects.all()]
+            self.assertEqual(models.TestL10nModel.objects.localized_values(), expected)
+
+        translation.activate('en')
+        values = models.TestModel.objects.filter(pk=1).localized_values('charfield', language='de')
+        self.assertEqual(values, [{'pk':1, 'charfield':'Hoi Ik ben de root node'}])
+        self.assertEqual(translation.get_language(), 'en')
+
+    def test_translation_table(self):
+        """Localized fields can be stored in the translation table instead of in columns"""
+        attnames = [field.attname for field in models.TranslationTableModel._meta.fields]
+        self.assertFalse('title_en' in attnames)
+        self.assertFalse('price_de' in attnames)
+
+        translation.activate('en')
+        i = models.TranslationTableModel(title="Hello", price=1.5, code='a')
+        i.save()
+        translation.activate('de')
+        i.title = "Hallo"
+        i.save()
+        self.assertEqual(Translation.objects.filter(language='de').count(), 1)
+        # saving the object takes two queries, the rows are loaded with one
+        # query, a changed row is updated and the missing rows are inserted
+        # with one query.
+        i.title = "Hallo!"
+        i.title_en_us = "Howdy"
+        i.price_en_us = 1.5
+        with self.assertNumQueries(5):
+            i.save()
+        self.assertEqual(Translation.objects.filter(language='de').get().value, "Hallo!")
+        self.assertEqual(Translation.objects.filter(language='en-us').count(), 2)
+        i.title_en_us = None
+        i.save()
+        self.assertEqual(Translation.objects.filter(language='en-us').count(), 1)
+
+        # the languages needed in the current language are loaded with one query.
+        with self.assertNumQueries(2):
+            i = models.TranslationTableModel.objects.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(i.title, "Hallo!")
+            self.assertEqual(i.price, 1.5)
+
+        translation.activate('en')
+        i = models.TranslationTableModel.objects.get()
+        with self.assertNumQueries(1):
+            self.assertEqual(i.title_de, "Hallo!")
+
+        values = models.TranslationTableModel.objects.localized_values('title', language='de')
+        self.assertEqual(values, [{'pk': i.pk, 'title': "Hallo!"}])
+
+        i.delete()
+        self.assertEqual(Translation.objects.count(), 0)
+
+    def test_translation_table_chunks(self):
+        """The values in the translation table should be loaded for each chunk of objects"""
+        models.TranslationTableModel.objects.bulk_create(
+            [models.TranslationTableModel(code=str(x)) for x in range(query.CHUNK_SIZE + 1)])
+
+        # the content type is cached after the first query
+        ContentType.objects.get_for_model(models.TranslationTableModel)
+        objects = models.TranslationTableModel.objects.iterator()
+        with self.assertNumQueries(2):
+            objects.next()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(objects)), query.CHUNK_SIZE)
+
+    def test_for_language(self):
+        """Only the columns needed in the current language should be loaded"""
+        self.setup_l10n_model()
+
+        i = models.TestL10nModel.objects.for_language().get()
+        self.assertTrue('title_en' in i.__dict__)
+        self.assertFalse('title_de' in i.__dict__)
+        self.assertFalse('description_en_us' in i.__dict__)
+        self.assertEqual(i.title, "Ik ben de groot moeftie van cambodja")
+        self.assertEqual(i.title_de, None)
+
+        # 'en-us' is the fallback of 'de'
+        i = models.TestL10nModel.objects.for_language('de').get()
+        self.assertTrue('title_de' in i.__dict__)
+        self.assertTrue('title_en_us' in i.__dict__)
+
+        models.TestL10nModel.defer_languages = True
+        try:
+            i = models.TestL10nModel.objects.get()
+            self.assertFalse('title_de' in i.__dict__)
+            i = models.TestL10nModel.objects.only('title_de', 'price').get()
+            self.assertTrue('title_de' in i.__dict__)
+        finally:
+            models.TestL10nModel.defer_languages = False
+
     def test_meta_now_selects_correct_field_on_propert_write(self):
         """Easymode should write to title_en if language is en and property is title"""            
         i = self.setup_l10n_model()
@@ -275,6 +451,28 @@ class Testi18n(TestCase):
         # Test
         self.assertEqual(i.charfield, 'Woot, not failed!')
 
+    def test_localized_values_are_remembered_per_language(self):
+        """The value of a localized field should be looked up once per language until it changes"""
+        translation.activate('en')
+        t = models.TestModel.objects.get(charfield_en='Hoi Ik ben de root node')
+        value = t.charfield
+        self.assertTrue(t.charfield is value)
+
+        translation.activate('de')
+        self.assertEqual(t.charfield, 'Hoi Ik ben de root node')
+
+        # the fallback language of 'de' is changed directly, which is seen
+        # after saving.
+        t.charfield_en_us = 'Hoi I am An american'
+        t.save()
+        self.assertEqual(t.charfield, 'Hoi I am An american')
+
+        translation.activate('en')
+        self.assertEqual(t.charfield, 'Hoi Ik ben de root node')
+
+        t.charfield = 'Hoi ik ben gewijzigd'
+        self.assertEqual(t.charfield, 'Hoi ik ben gewijzigd')
+
 
     def test_translated_fields_handle_correctly_under_to_xml(self):
         """A field that is translated should show the correct value when converted to xml"""
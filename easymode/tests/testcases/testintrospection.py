@@ -1,10 +1,11 @@
 import inspect
 
+from django.db.models.signals import class_prepared
 from django.test import TestCase
 from django.utils.translation import activate
 
 from easymode.i18n.meta import DefaultFieldDescriptor
-from easymode.tests.models import ManagerErrorModel
+from easymode.tests.models import ManagerErrorModel, TopModel
 from easymode.tests.testcases import initdb
 from easymode.tree import introspection
 
@@ -55,5 +56,13 @@ class TestIntrospection(TestCase):
             self.failUnlessEqual(type(value), DefaultFieldDescriptor)
         
         self.failUnlessEqual(len(descriptors), 2)
-        
-        
\ No newline at end of file
+
+    def test_members_are_inspected_only_once(self):
+        "The members of a model should be taken from the registry until a new model is prepared"
+        descriptors = introspection.get_default_field_descriptors(ManagerErrorModel)
+        self.failUnless(descriptors is introspection.get_default_field_descriptors(ManagerErrorModel))
+        self.failUnless(descriptors is introspection.get_default_field_descriptors(ManagerErrorModel.objects.get(pk=1)))
+
+        class_prepared.send(sender=TopModel)
+        self.failIf(descriptors is introspection.get_default_field_descriptors(ManagerErrorModel))
+        self.failUnlessEqual(descriptors, introspection.get_default_field_descriptors(ManagerErrorModel))
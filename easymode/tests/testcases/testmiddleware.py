@@ -1,7 +1,12 @@
+import sys
+
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template import Context, Template
 from django.test import TestCase
+from django.utils import translation
 from django.utils.decorators import decorator_from_middleware
+from django.utils.importlib import import_module
 
 from easymode import middleware
 from easymode.tests.testcases import initdb
@@ -19,6 +24,23 @@ def localise_urls_middleware_view(request):
     <a href="/de/reallanguagecode.html"/>
     """)
 
+@decorator_from_middleware(middleware.LocaliseUrlsMiddleware)
+def localise_urls_middleware_streaming_view(request):
+    return StreamingHttpResponse(iter([
+        '<a href="/example/one.html">one</a><a hr',
+        'ef="/example/two.html">two</a><',
+        'form action="/example/three.html"',
+        '><a href="/de/four.html">four</a>',
+    ]))
+
+@decorator_from_middleware(middleware.LocaliseUrlsMiddleware)
+@middleware.urls_localised
+def localise_urls_while_rendering_view(request):
+    return HttpResponse(Template("""{% load easyfilters %}
+    <a href="{{ '/example/modifyme.html'|localise_url }}">hhh</a>
+    <a href="/example/staysthesame.html">hhh</a>
+    """).render(Context()))
+
 @initdb
 class TestLocaliseUrlsMiddleware(TestCase):
     """Test the middlewares that come with easymode"""
@@ -45,6 +67,43 @@ class TestLocaliseUrlsMiddleware(TestCase):
         self.assertContains(result, 'href="/de/reallanguagecode.html"')
 
 
+    def test_localise_urls_middleware_streaming(self):
+        "The LocaliseUrlsMiddleware should localise tags that are split over the chunks of a streaming response"
+
+        result = localise_urls_middleware_streaming_view(type('RequestMock', tuple(), {'path':'koek', 'LANGUAGE_CODE':'en'}))
+        content = ''.join(result.streaming_content)
+
+        self.assertEqual(content, '<a href="/en/example/one.html">one</a>'
+            '<a href="/en/example/two.html">two</a>'
+            '<form action="/en/example/three.html">'
+            '<a href="/de/four.html">four</a>')
+
+    def test_localise_urls_while_rendering(self):
+        "The LocaliseUrlsMiddleware should not change responses that were localised while rendering"
+
+        translation.activate('de')
+        try:
+            result = localise_urls_while_rendering_view(type('RequestMock', tuple(), {'path':'koek', 'LANGUAGE_CODE':'de'}))
+        finally:
+            translation.deactivate()
+
+        self.assertContains(result, 'href="/de/example/modifyme.html"')
+        self.assertContains(result, 'href="/example/staysthesame.html"')
+
+    def test_easyfilters_without_admin_media_prefix(self):
+        "The easyfilters library should load when the settings the middlewares need are missing"
+        saved_modules = dict((name, sys.modules.pop(name)) for name in
+            ('easymode.middleware', 'easymode.templatetags.easyfilters') if name in sys.modules)
+        admin_media_prefix = settings.ADMIN_MEDIA_PREFIX
+        del settings.ADMIN_MEDIA_PREFIX
+        try:
+            easyfilters = import_module('easymode.templatetags.easyfilters')
+            self.assertEqual(easyfilters.strip_locale('/de/example.html'), '/example.html')
+            self.assertFalse('easymode.middleware' in sys.modules)
+        finally:
+            settings.ADMIN_MEDIA_PREFIX = admin_media_prefix
+            sys.modules.update(saved_modules)
+
     def test_localise_urls_middleware_use_short_language_codes(self):
         """
         The LocaliseUrlsMiddleware should insert a short version of the
@@ -95,6 +154,44 @@ class TestLocaleFromUrlMiddleWare(TestCase):
         self.assertEqual(result.content, 'en-us')
         
         
+    def test_locale_from_url_middle_ware_session(self):
+        """The language should only be stored when it changed, and never when
+        LANGUAGE_FROM_URL_ONLY=True"""
+
+        class SessionMock(dict):
+            modified = False
+            def __setitem__(self, key, value):
+                self.modified = True
+                super(SessionMock, self).__setitem__(key, value)
+
+        request = self.RequestMockShort()
+        request.session = SessionMock()
+        locale_from_url_middle_ware_view(request)
+        self.assertTrue(request.session.modified)
+        self.assertEqual(request.session.values(), ['en'])
+
+        request.session.modified = False
+        locale_from_url_middle_ware_view(request)
+        self.assertFalse(request.session.modified)
+
+        self.settingsManager.set(LANGUAGE_FROM_URL_ONLY=True)
+        request = self.RequestMockLong()
+        request.session = SessionMock()
+        result = locale_from_url_middle_ware_view(request)
+        self.assertEqual(request.session, {})
+        self.assertFalse(result.cookies)
+
+    def test_locale_from_url_middle_ware_cookie(self):
+        "Without a session the language should be stored in a cookie on the response"
+
+        result = locale_from_url_middle_ware_view(self.RequestMockShort())
+        self.assertEqual(result.cookies[settings.LANGUAGE_COOKIE_NAME].value, 'en')
+
+        request = self.RequestMockShort()
+        request.COOKIES = {settings.LANGUAGE_COOKIE_NAME: 'en'}
+        result = locale_from_url_middle_ware_view(request)
+        self.assertFalse(result.cookies)
+
     def test_locale_from_url_middle_ware_short(self):
         """When USE_SHORT_LANGUAGE_CODES=True languages in urls should be
         treated as shorthands for longer language codes."""
@@ -1,10 +1,17 @@
 from hashlib import md5
 
 from django.test import TestCase
+from lxml import etree
 
+from easymode.i18n.meta import catalogs
 from easymode.tree import xml as tree
-from easymode.tests.models import TestModel, TestGenericFkModel, TagModel
+from easymode.tests.models import TestModel, TestGenericFkModel, TagModel, \
+    TestSubSubModel, TopModel
 from easymode.tests.testcases import initdb
+from easymode.tree.xml import fragments
+from easymode.tree.xml.fragments import get_fragment_cache, GENERATION_KEY
+from easymode.tree.xml.plan import get_serialization_plan
+from easymode.tree.xml.prefetch import get_prefetch_lookups, prefetch_tree
 from easymode.tree.xml.serializers import RecursiveXmlSerializer
 
 
@@ -86,3 +93,142 @@ class RecursiveSerializerTest(TestCase):
         first_item.save()
         data = tree.xml(TestModel.objects.all())
         assert(data.index('<taggy>bad</taggy>')!= -1)
+
+    def test_tree_is_prefetched(self):
+        "The number of queries should depend on the depth of the tree, not on the number of objects"
+        first_item = TestModel.objects.get(pk=1)
+        for i in range(5):
+            submodel = first_item.submodels.create(subcharfield="sub %s" % i, subintegerfield=i)
+            submodel.subsubmodels.create(subsubcharfield="subsub %s" % i)
+
+        # 1 for the root objects, 3 for the relations of TestModel and 1 for
+        # the relation of TestSubModel.
+        self.assertNumQueries(5, tree.xml, TestModel.objects.all())
+
+        ser = RecursiveXmlSerializer()
+        prefetched_xml = ser.serialize(TestModel.objects.all())
+        ser = RecursiveXmlSerializer()
+        self.assertEqual(ser.serialize(TestModel.objects.all(), prefetch=False), prefetched_xml)
+        assert(prefetched_xml.index('subsub 4') != -1)
+
+    def test_iterxml(self):
+        "iterxml should produce the same xml as xml, in chunks"
+        TestModel.objects.create(charfield='second root node')
+
+        chunks = list(tree.iterxml(TestModel.objects.all()))
+        # 1 for the start of the document, 1 for each object and 1 for the end.
+        self.assertEqual(len(chunks), TestModel.objects.count() + 2)
+        self.assertEqual(''.join(chunks), tree.xml(TestModel.objects.all()))
+
+        first_item = TestModel.objects.get(pk=1)
+        self.assertEqual(''.join(tree.iterxml(first_item)), tree.xml(first_item))
+        assert( md5(''.join(tree.iterxml(first_item))).hexdigest() == CONFIRMED_XML_DIGEST)
+
+    def test_serialization_plan_is_compiled_once(self):
+        "The fields of a model should be inspected only once for every set of selected fields"
+        plan = get_serialization_plan(TestModel)
+        self.assertTrue(plan is get_serialization_plan(TestModel))
+
+        tags_plan = get_serialization_plan(TestModel, ['tags'])
+        self.assertTrue(tags_plan is not plan)
+        self.assertTrue(tags_plan is get_serialization_plan(TestModel, ('tags',)))
+        self.assertEqual(tags_plan.many_to_many, [TestModel._meta.get_field('tags')])
+        self.assertEqual(tags_plan.local_fields, [])
+
+    def test_prefetch_selected_fields(self):
+        "Only the many to many relations that are serialized should be prefetched"
+        self.assertTrue('tags' in get_prefetch_lookups(TestModel))
+        self.assertFalse('tags' in get_prefetch_lookups(TestModel, ['charfield']))
+
+        objects = list(TestModel.objects.all())
+        prefetch_tree(objects, ['charfield'])
+        self.assertFalse('tags' in objects[0]._prefetched_objects_cache)
+
+        objects = list(TestModel.objects.all())
+        prefetch_tree(objects)
+        self.assertTrue('tags' in objects[0]._prefetched_objects_cache)
+
+    def test_fragment_cache(self):
+        "Cached fragments should be used until an object in their tree is changed"
+        self.settingsManager.set(XML_FRAGMENT_CACHE='easymode.tree.xml.fragments.LocalLRUBackend')
+        # the transactions of other tests are rolled back without sending signals.
+        get_fragment_cache().clear()
+
+        first_item = TestModel.objects.get(pk=1)
+        for i in range(5):
+            submodel = first_item.submodels.create(subcharfield="sub %s" % i, subintegerfield=i)
+            submodel.subsubmodels.create(subsubcharfield="subsub %s" % i)
+
+        def assertXmlIsUpToDate():
+            ser = RecursiveXmlSerializer()
+            self.assertEqual(tree.xml(TestModel.objects.all()), ser.serialize(TestModel.objects.all(), fragments=False))
+
+        assertXmlIsUpToDate()
+        # only the root objects are loaded, the rest comes from the cache.
+        self.assertNumQueries(1, tree.xml, TestModel.objects.all())
+
+        subsubmodel = submodel.subsubmodels.get()
+        subsubmodel.subsubcharfield = 'changed leaf'
+        subsubmodel.save()
+        assertXmlIsUpToDate()
+        assert(tree.xml(TestModel.objects.all()).index('changed leaf') != -1)
+
+        # the natural key of first_item is part of the xml of it's children.
+        first_item.charfield = 'changed natural key'
+        first_item.save()
+        assertXmlIsUpToDate()
+
+        first_item.tags.add(TagModel.objects.get(value_en='bad'))
+        assertXmlIsUpToDate()
+
+        subsubmodel.delete()
+        assertXmlIsUpToDate()
+        self.assertEqual(tree.xml(TestModel.objects.all()).find('changed leaf'), -1)
+
+    def test_fragment_cache_is_only_used_for_the_top_level_objects(self):
+        "The fragment cache should be looked up once for each batch of top level objects"
+        self.settingsManager.set(XML_FRAGMENT_CACHE='easymode.tree.xml.fragments.LocalLRUBackend')
+        get_fragment_cache().clear()
+        first_item = TestModel.objects.get(pk=1)
+        for i in range(5):
+            first_item.submodels.create(subcharfield="sub %s" % i, subintegerfield=i)
+
+        fragment_cache = get_fragment_cache()
+        lookups = []
+        get_many = fragment_cache.get_many
+        fragment_cache.get_many = lambda objects, variant: lookups.append(objects) or get_many(objects, variant)
+        try:
+            tree.xml(TestModel.objects.all())
+        finally:
+            del fragment_cache.get_many
+        self.assertEqual(lookups, [[first_item]])
+
+    def test_fragment_cache_only_watches_serialized_models(self):
+        "Only the models in the tree of a serialized model should invalidate fragments"
+        self.assertTrue(TestSubSubModel in fragments._watched_models)
+        self.assertFalse(TopModel in fragments._watched_models)
+
+    def test_fragment_cache_is_cleared_with_the_catalogs(self):
+        "Cached fragments should not be used after the catalogs were changed"
+        self.settingsManager.set(XML_FRAGMENT_CACHE='easymode.tree.xml.fragments.LocalLRUBackend')
+        tree.xml(TestModel.objects.all())
+        backend = get_fragment_cache().backend
+        generation = backend.get_many([GENERATION_KEY])[GENERATION_KEY]
+
+        catalogs.clear()
+        self.assertNotEqual(backend.get_many([GENERATION_KEY])[GENERATION_KEY], generation)
+
+    def test_element_tree(self):
+        "element_tree should build the same tree that is found by parsing the xml"
+        first_item = TestModel.objects.get(pk=1)
+        first_item.submodels.create(subcharfield="<escaped> & tail", subintegerfield=3)
+
+        for obj in (first_item, TestModel.objects.all()):
+            parsed_tree = etree.fromstring(tree.xml(obj))
+            self.assertEqual(etree.tostring(tree.element_tree(obj)), etree.tostring(parsed_tree))
+
+        # cached fragments are parsed into the tree.
+        self.settingsManager.set(XML_FRAGMENT_CACHE='easymode.tree.xml.fragments.LocalLRUBackend')
+        get_fragment_cache().clear()
+        tree.xml(TestModel.objects.all())
+        self.assertEqual(etree.tostring(tree.element_tree(TestModel.objects.all())), etree.tostring(parsed_tree))
@@ -4,9 +4,13 @@ from hashlib import sha1
 from os.path import join
 
 from django.conf import settings
+from django.template import TemplateDoesNotExist
 from django.test import TestCase
+from django.test.utils import override_settings
 
 from easymode.utils import mutex, SemaphoreException, recursion_depth
+from easymode.utils.languagecode import get_language_registry, split_language_prefix
+from easymode.utils.template import find_template_path
 
 
 __all__ = ('TestUtils',)
@@ -63,3 +67,44 @@ class TestUtils(TestCase):
         recurse(range(0,10))
         self.assertRaises(Exception, recurse, range(0,11))
         
+
+    def test_find_template_path(self):
+        """find_template_path should return the path of the template and remember it"""
+        path = find_template_path('xslt/model-to-xml.xsl')
+        self.assertTrue(path.endswith(join('xslt', 'model-to-xml.xsl')))
+        self.assertTrue(os.path.isfile(path))
+        self.assertTrue(find_template_path('xslt/model-to-xml.xsl') is path)
+        self.assertRaises(TemplateDoesNotExist, find_template_path, 'xslt/does-not-exist.xsl')
+
+        # while developing, templates can be added that override it.
+        with override_settings(DEBUG=True):
+            self.assertEqual(find_template_path('xslt/model-to-xml.xsl'), path)
+            self.assertFalse(find_template_path('xslt/model-to-xml.xsl') is path)
+
+    def test_language_registry_follows_settings(self):
+        """The language registry should be built again when a language setting is changed"""
+        registry = get_language_registry()
+        self.assertTrue(get_language_registry() is registry)
+
+        use_short_language_codes = getattr(settings, 'USE_SHORT_LANGUAGE_CODES', False)
+        with override_settings(USE_SHORT_LANGUAGE_CODES=not use_short_language_codes):
+            self.assertEqual(get_language_registry().use_short_language_codes, not use_short_language_codes)
+        self.assertEqual(get_language_registry().use_short_language_codes, use_short_language_codes)
+
+        # LANGUAGES can be replaced without override_settings.
+        languages = settings.LANGUAGES
+        settings.LANGUAGES = (('en-us', 'English'),)
+        try:
+            self.assertEqual(get_language_registry().language_codes, ('en-us',))
+        finally:
+            settings.LANGUAGES = languages
+        self.assertTrue(get_language_registry().languages is languages)
+
+    @override_settings(LANGUAGES=(('en-us', 'English'), ('de', 'German')), USE_SHORT_LANGUAGE_CODES=False)
+    def test_split_language_prefix(self):
+        """split_language_prefix should only split off a language code at the start of the path"""
+        self.assertEqual(split_language_prefix('/de/example.html'), ('de', '/example.html'))
+        self.assertEqual(split_language_prefix('/en-us/de/example.html'), ('en-us', '/de/example.html'))
+        self.assertEqual(split_language_prefix('/en/example.html'), (None, '/en/example.html'))
+        self.assertEqual(split_language_prefix('/example.html'), (None, '/example.html'))
+        self.assertEqual(split_language_prefix('/de'), (None, '/de'))
@@ -1,12 +1,21 @@
+import os.path
+import shutil
+import tempfile
+
 from django.http import HttpResponse
 from django.template.loader import find_template_source
 from django.test import TestCase
+from django.utils import translation
 
 from easymode.tree import xml as tree
 from easymode.tests.models import TestModel
 from easymode.tests.testcases import initdb
 from easymode.utils.languagecode import get_language_codes
-from easymode.xslt import response
+from easymode.utils.template import find_template_path
+from easymode.xslt import response, transform, checkout_stylesheet, precompile_stylesheets
+from easymode.xslt.executor import submit
+from easymode.xslt.extensions import NAMESPACE
+from easymode.xslt.pool import StylesheetPool, get_stats, reset_stats
 
 
 if 'en-us' not in get_language_codes():
@@ -14,6 +23,14 @@ if 'en-us' not in get_language_codes():
 
 __all__ = ('XsltTest',)
 
+class XmlString(object):
+    "Has an ``__xml__`` method, so it can be rendered without the database"
+    def __init__(self, xml):
+        self.xml = xml
+
+    def __xml__(self):
+        return self.xml
+
 @initdb
 class XsltTest(TestCase):
     """
@@ -53,4 +70,93 @@ class XsltTest(TestCase):
         """docstring for test_xslt_will_render_queryset"""
         data = TestModel.objects.all()
         resp = response.render_to_response('xslt/model-to-xml.xsl', data)
-        assert(resp)
\ No newline at end of file
+        assert(resp)
+
+    def test_element_tree_is_transformed_like_xml(self):
+        "render_to_string transforms an element tree, which should give the same result as the xml"
+        data = TestModel.objects.all()
+        xsl_path = find_template_path('xslt/model-to-xml.xsl')
+        self.assertEqual(response.render_to_string('xslt/model-to-xml.xsl', data),
+            transform(tree.xml(data), str(xsl_path)))
+
+    def test_stylesheets_are_compiled_once(self):
+        "A stylesheet should only be compiled when no compiled instance is available"
+        xsl_path = str(find_template_path('xslt/model-to-xml.xsl'))
+        with checkout_stylesheet(xsl_path) as first:
+            pass
+        with checkout_stylesheet(xsl_path) as second:
+            self.assertTrue(first is second)
+            with checkout_stylesheet(xsl_path) as third:
+                # the first one is in use.
+                self.assertTrue(third is not first)
+
+        compiled = precompile_stylesheets([os.path.dirname(xsl_path)])
+        self.assertTrue(os.path.abspath(xsl_path) in map(os.path.abspath, compiled))
+
+    def test_stylesheet_pool(self):
+        "A pool should never compile more than max_size instances"
+        reset_stats()
+        pool = StylesheetPool('foo.xsl', lambda path: object(), max_size=2)
+        first = pool.checkout()
+        second = pool.checkout()
+        pool.checkin(first)
+        self.assertTrue(pool.checkout() is first)
+        pool.checkin(second)
+        pool.checkin(first)
+
+        stats = get_stats()
+        self.assertEqual(stats['compiles'], 2)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['waits'], 0)
+
+    def test_closed_stylesheet_pool(self):
+        "A closed pool should release it's instances as soon as they are not in use"
+        released = []
+        pool = StylesheetPool('foo.xsl', lambda path: object(), release=released.append)
+        first = pool.checkout()
+        second = pool.checkout()
+        pool.checkin(first)
+
+        pool.close()
+        self.assertEqual(released, [first])
+        pool.checkin(second)
+        self.assertEqual(released, [first, second])
+
+    def test_render_to_string_async(self):
+        "render_to_string_async should render in another thread, with the same language"
+        # the test database can not be used by other threads.
+        data = XmlString(tree.xml(TestModel.objects.all()))
+        future = response.render_to_string_async('xslt/model-to-xml.xsl', data)
+        self.assertEqual(future.result(), response.render_to_string('xslt/model-to-xml.xsl', data))
+
+        translation.activate('nl')
+        try:
+            self.assertEqual(submit(translation.get_language).result(), 'nl')
+        finally:
+            translation.deactivate()
+
+    def test_localise_url_extension(self):
+        "easymode:localise-url should insert the current language in an url"
+        directory = tempfile.mkdtemp()
+        try:
+            xsl_path = os.path.join(directory, 'localise.xsl')
+            with open(xsl_path, 'w') as xsl_file:
+                xsl_file.write("""<?xml version="1.0" encoding="utf-8"?>
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform" xmlns:easymode="%s">
+    <xsl:output method="html"/>
+    <xsl:template match="/">
+        <a href="{easymode:localise-url(/root/@href)}"/>
+        <a href="{easymode:localise-url('/en/about/')}"/>
+    </xsl:template>
+</xsl:stylesheet>""" % NAMESPACE)
+
+            translation.activate('de')
+            try:
+                result = transform('<root href="/about/"/>', xsl_path)
+            finally:
+                translation.deactivate()
+
+            self.assertTrue('href="/de/about/"' in result)
+            self.assertTrue('href="/en/about/"' in result)
+        finally:
+            shutil.rmtree(directory)
@@ -2,6 +2,11 @@ from django.conf import settings
 from django.core.management import call_command
 from django.db.models import loading
 
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
 
 __all__ = ('TestSettingsManager',)
 
@@ -24,6 +29,7 @@ class TestSettingsManager(object):
             self._original_settings.setdefault(k, getattr(settings, k,
                                                           NO_SETTING))
             setattr(settings, k, v)
+            setting_changed.send(sender=settings._wrapped.__class__, setting=k, value=v, enter=True)
         if 'INSTALLED_APPS' in kwargs:
             self.syncdb()
 
@@ -35,8 +41,10 @@ class TestSettingsManager(object):
         for k,v in self._original_settings.iteritems():
             if v == NO_SETTING:
                 delattr(settings, k)
+                v = None
             else:
                 setattr(settings, k, v)
+            setting_changed.send(sender=settings._wrapped.__class__, setting=k, value=v, enter=False)
         if 'INSTALLED_APPS' in self._original_settings:
             self.syncdb()
         self._original_settings = {}
@@ -8,6 +8,7 @@ except ImportError:
 
 from django.db.models.base import ModelBase
 from django.db.models.fields.related import ForeignRelatedObjectsDescriptor, SingleRelatedObjectDescriptor
+from django.db.models.signals import class_prepared
 
 from easymode.i18n.meta import DefaultFieldDescriptor
 
@@ -21,32 +22,74 @@ to inspect %s looking for %s.
 Please report to easymode@librelist.com.
 """
 
+# The types of the members easymode looks for in model classes.
+MEMBER_TYPES = (
+    ForeignRelatedObjectsDescriptor,
+    SingleRelatedObjectDescriptor,
+    ReverseGenericRelatedObjectsDescriptor,
+    DefaultFieldDescriptor,
+)
+
+# per model class a dict that maps each of the MEMBER_TYPES to the members of
+# that type found in the model class.
+_members_registry = {}
+
+def _inspect_members(model):
+    """
+    Finds all members of any of the :data:`MEMBER_TYPES` in model.
+
+    :param model: A model class.
+    :rtype: A :class:`dict` that maps each type in :data:`MEMBER_TYPES` to\
+        a :class:`tuple` of (name, member) pairs.
+    """
+    members = dict((member_type, []) for member_type in MEMBER_TYPES)
+    for key in dir(model):
+        try:
+            attr = getattr(model, key)
+        except AttributeError as e:
+            try:
+                attr = model.__dict__[key]
+            except KeyError:
+                raise AttributeError(INTROSPECTION_ERROR % (e, model, MEMBER_TYPES))
+
+        member_type = type(attr)
+        if member_type in members:
+            members[member_type].append((key, attr))
+
+    return dict((member_type, tuple(found)) for (member_type, found) in members.iteritems())
+
 def _get_members_of_type(obj, member_type):
     """
     Finds members of a certain type in obj.
 
+    The members of a model class are only inspected once, after that they
+    are taken from the registry, until a new model class is prepared.
+
     :param obj: A model instance or class.
-    :param member_type: The type of the menber we are trying to find.
-    :rtype: A :class:`list` of ``member_type`` found in ``obj``
+    :param member_type: The type of the member we are trying to find, must be\
+        one of :data:`MEMBER_TYPES`.
+    :rtype: A :class:`tuple` of (name, member) pairs of ``member_type`` found in ``obj``
     """
 
     if not issubclass(type(obj), ModelBase):
         obj = obj.__class__
 
-    key_hash = []
-    for key in dir(obj):
-        try:
-            attr = getattr(obj, key)
-        except AttributeError as e:
-            try:
-                attr = obj.__dict__[key]
-            except KeyError:
-                raise AttributeError(INTROSPECTION_ERROR % (e, obj, member_type))
+    members = _members_registry.get(obj, None)
+    if members is None:
+        members = _inspect_members(obj)
+        _members_registry[obj] = members
+
+    return members[member_type]
 
-        if type(attr) is member_type:
-            key_hash.append((key, attr))
+def _invalidate_members_registry(sender, **kwargs):
+    """
+    When a model class is prepared, it might add related object descriptors to
+    any of the other models, so all the members must be inspected again.
+    """
+    _members_registry.clear()
 
-    return key_hash
+class_prepared.connect(_invalidate_members_registry,
+    dispatch_uid='easymode.tree.introspection._invalidate_members_registry')
 
 def get_foreign_key_desciptors(obj):
     """
@@ -6,7 +6,7 @@ This module contains the machinery to add recursive serialisation to xml
 and recursive admin support to the models in such a tree.
 """
 
-__all__ = ('xml', 'admin', 'decorators', 'introspection', 'query', 'serializers')
+__all__ = ('xml', 'iterxml', 'element_tree', 'admin', 'decorators', 'introspection', 'query', 'serializers')
 
 def xml(obj):
     """
@@ -18,4 +18,42 @@ def xml(obj):
     
     to xml
     """
-    return (obj.__xml__())
\ No newline at end of file
+    return (obj.__xml__())
+
+def iterxml(obj):
+    """
+    Works like :func:`xml`, but returns an iterator that yields the xml in
+    chunks, as each object at the top of the tree is finished. Use this to
+    write big trees to a file or to send them with a
+    :class:`~django.http.StreamingHttpResponse`::
+
+        from django.http import StreamingHttpResponse
+        from easymode.tree.xml import iterxml
+
+        return StreamingHttpResponse(iterxml(Foo.objects.all()), content_type='text/xml')
+
+    Objects that only have an ``__xml__`` method are returned in one chunk.
+    """
+    if hasattr(obj, '__iterxml__'):
+        return obj.__iterxml__()
+    return iter([obj.__xml__()])
+
+def element_tree(obj):
+    """
+    Works like :func:`xml`, but returns an `lxml <http://codespeak.net/lxml/>`_
+    element tree instead of a string. The tree is built directly, using
+    :class:`~easymode.utils.xmlutils.XmlTreeBuilder`, so it can be
+    transformed with :mod:`easymode.xslt` without parsing any xml::
+
+        from easymode.tree.xml import element_tree
+        from easymode.xslt import transform
+
+        result = transform(element_tree(Foo.objects.all()), 'foo.xsl')
+
+    Objects that only have an ``__xml__`` method are parsed.
+    """
+    if hasattr(obj, '__element_tree__'):
+        return obj.__element_tree__()
+
+    from lxml import etree
+    return etree.ElementTree(etree.fromstring(obj.__xml__()))
@@ -4,12 +4,14 @@ models as a method. In effect it adds an ``__xml__`` method to both the model an
 the queryset used in the model.
 """
 
+from easymode.tree.xml.fragments import watch_model
 from easymode.tree.xml.serializers import RecursiveXmlSerializer
-from easymode.tree.xml.query import QuerySetManager, XmlSerializableQuerySet
+from easymode.tree.xml.query import QuerySetManager, XmlSerializableQuerySet, \
+    LocalizedXmlSerializableQuerySet
 
 def toxml(cls):
     """
-    adds an ``__xml__`` method to both the queryset as the model class.
+    adds an ``__xml__``, an ``__iterxml__`` and an ``__element_tree__`` method to both the queryset as the model class.
     
     usage::
     
@@ -36,7 +38,26 @@ def toxml(cls):
         """turn model object into xml recursively"""
         ser = RecursiveXmlSerializer()
         return ser.serialize([self])
+
+    def __iterxml__(self):
+        """turn model object into xml recursively, in chunks"""
+        ser = RecursiveXmlSerializer()
+        return ser.iterserialize([self])
+
+    def __element_tree__(self):
+        """turn model object into an lxml element tree recursively"""
+        ser = RecursiveXmlSerializer()
+        return ser.serialize_tree([self])
     
-    cls.add_to_class('objects', QuerySetManager(XmlSerializableQuerySet))
+    # keep the methods added by I18n.
+    if hasattr(cls, 'localized_fields'):
+        cls.add_to_class('objects', QuerySetManager(LocalizedXmlSerializableQuerySet))
+    else:
+        cls.add_to_class('objects', QuerySetManager(XmlSerializableQuerySet))
     cls.__xml__ = __xml__
+    cls.__iterxml__ = __iterxml__
+    cls.__element_tree__ = __element_tree__
+
+    # changes to the tree of cls invalidate it's cached xml.
+    watch_model(cls)
     return cls
@@ -0,0 +1,453 @@
+"""
+Contains a cache for the xml of serialized objects, including the xml of all
+their descendants.
+
+When :ref:`xml_fragment_cache` is set, the xml of every object that is
+serialized by :class:`~easymode.tree.xml.serializers.RecursiveXmlSerializer`
+is stored in the cache. The next time the same object is serialized, it's
+xml is taken from the cache and neither the object nor it's descendants need
+to be loaded from the database.
+
+The key of a fragment contains a version token of the object, which is
+renewed each time the object is modified. When an object is saved or deleted,
+the tokens of the object and of all it's ancestors in the tree are renewed.
+Only the fragments of the top level objects that are serialized are looked
+up, so a batch of objects costs a single round trip to the cache, and a change
+to a single leaf makes the tree of it's root be serialized again.
+
+The signal handlers that renew the tokens are only connected to the models
+that can be part of the xml, see :func:`watch_model`.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import class_prepared, pre_save, post_save, \
+    pre_delete, m2m_changed
+from django.utils import translation
+from django.utils.encoding import smart_str
+
+try:
+    from importlib import import_module
+except ImportError:
+    from django.utils.importlib import import_module
+
+try:
+    from django.apps import apps
+    get_models = apps.get_models
+except ImportError:
+    from django.db.models import get_models
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from django.utils.datastructures import SortedDict as OrderedDict
+
+from easymode.i18n.meta.catalogs import catalogs_cleared
+from easymode.tree.xml.plan import get_serialization_plan
+
+
+__all__ = ('LocalLRUBackend', 'DjangoCacheBackend', 'FragmentCache', 'get_fragment_cache',
+    'watch_model')
+
+# key of the token that is part of every fragment key, so all fragments can
+# be invalidated at once.
+GENERATION_KEY = 'easymode.xml.generation'
+
+
+class LocalLRUBackend(object):
+    """
+    Keeps the fragments in the memory of the current process. When there are
+    more than ``max_entries`` entries, the least recently used are discarded.
+    """
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        result = {}
+        with self._lock:
+            for key in keys:
+                try:
+                    value = self._entries.pop(key)
+                except KeyError:
+                    continue
+                # put it back at the end, where the most recently used are
+                self._entries[key] = value
+                result[key] = value
+        return result
+
+    def set_many(self, values):
+        with self._lock:
+            for (key, value) in values.iteritems():
+                self._entries.pop(key, None)
+                self._entries[key] = value
+
+            for i in xrange(len(self._entries) - self.max_entries):
+                del self._entries[iter(self._entries).next()]
+
+class DjangoCacheBackend(object):
+    """
+    Keeps the fragments in one of django's caches, so they are shared
+    between processes.
+
+    :param cache_alias: The name of the cache in ``settings.CACHES``.
+    :param timeout: The number of seconds a fragment is kept, or None to use\
+        the cache's default timeout.
+    """
+    def __init__(self, cache_alias='default', timeout=None):
+        try:
+            from django.core.cache import caches
+            self.cache = caches[cache_alias]
+        except ImportError:
+            from django.core.cache import get_cache
+            self.cache = get_cache(cache_alias)
+        self.timeout = timeout
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def set_many(self, values):
+        if self.timeout is None:
+            self.cache.set_many(values)
+        else:
+            self.cache.set_many(values, self.timeout)
+
+def _new_token():
+    return uuid.uuid4().hex
+
+def _version_key(obj):
+    opts = obj._meta.concrete_model._meta
+    return smart_str('easymode.xml.version:%s.%s:%s' % (opts.app_label, opts.object_name.lower(), obj.pk))
+
+class FragmentCache(object):
+    """
+    Stores the xml of serialized objects in ``backend``, which can be any
+    object that implements ``get_many(keys)`` and ``set_many(values)`` like
+    :class:`LocalLRUBackend` and :class:`DjangoCacheBackend`.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get_many(self, objects, variant):
+        """
+        Looks up the fragments of ``objects``.
+
+        :param objects: A list of model instances.
+        :param variant: A string that tells apart the xml of the same object\
+            produced with different options.
+        :rtype: A list of (key, fragment) for each object, where fragment is\
+            None if the object was not found. The key is None for objects that\
+            can not be cached, because they implement ``__serialize__``.
+        """
+        version_keys = [None if hasattr(obj, '__serialize__') else _version_key(obj) for obj in objects]
+        versions = self.backend.get_many([key for key in version_keys if key is not None] + [GENERATION_KEY])
+
+        # objects that where never seen before, or whose version was
+        # discarded, get a new one. Fragments stored under an old version can
+        # never be found again.
+        new_versions = {}
+        for key in version_keys:
+            if key is not None and key not in versions:
+                new_versions[key] = versions[key] = _new_token()
+        if GENERATION_KEY not in versions:
+            new_versions[GENERATION_KEY] = versions[GENERATION_KEY] = _new_token()
+        if new_versions:
+            self.backend.set_many(new_versions)
+
+        for obj in objects:
+            if obj.__class__ not in _tree_models:
+                watch_model(obj.__class__)
+
+        fragment_keys = []
+        for key in version_keys:
+            if key is None:
+                fragment_keys.append(None)
+            else:
+                fragment_keys.append('easymode.xml.fragment:%s:%s:%s:%s' % (
+                    key[len('easymode.xml.version:'):], versions[key], versions[GENERATION_KEY], variant))
+
+        fragments = self.backend.get_many([key for key in fragment_keys if key is not None])
+        return [(key, fragments.get(key, None)) for key in fragment_keys]
+
+    def set(self, key, fragment):
+        """
+        Stores ``fragment`` under a key returned by :meth:`get_many`.
+        """
+        self.backend.set_many({key:fragment})
+
+    def invalidate(self, instance):
+        """
+        Makes sure the fragments of ``instance`` and all of it's ancestors
+        will be serialized again.
+
+        When the model of ``instance`` has a ``natural_key`` method, the
+        objects that refer to ``instance`` with a foreign key are invalidated
+        as well, because the natural key is part of their xml.
+        """
+        pending = [instance]
+        if hasattr(instance, 'natural_key'):
+            pending.extend(_get_referrers(instance))
+
+        keys = set()
+        while pending:
+            obj = pending.pop()
+            key = _version_key(obj)
+            if key not in keys:
+                keys.add(key)
+                pending.extend(_get_parents(obj))
+
+        self.backend.set_many(dict((key, _new_token()) for key in keys))
+
+    def clear(self):
+        """
+        Makes sure all fragments will be serialized again, for example after
+        the gettext catalogs where changed.
+        """
+        self.backend.set_many({GENERATION_KEY:_new_token()})
+
+_fragment_cache = None
+
+def get_fragment_cache():
+    """
+    Returns the :class:`FragmentCache` configured by :ref:`xml_fragment_cache`,
+    or None if no cache is configured.
+    """
+    global _fragment_cache
+
+    backend_path = getattr(settings, 'XML_FRAGMENT_CACHE', None)
+    if backend_path is None:
+        return None
+
+    options = getattr(settings, 'XML_FRAGMENT_CACHE_OPTIONS', {})
+    if _fragment_cache is None or _fragment_cache.configuration != (backend_path, options):
+        (module_name, class_name) = backend_path.rsplit('.', 1)
+        backend_class = getattr(import_module(module_name), class_name)
+        fragment_cache = FragmentCache(backend_class(**options))
+        fragment_cache.configuration = (backend_path, options)
+        _fragment_cache = fragment_cache
+
+    return _fragment_cache
+
+def get_variant(use_natural_keys, indent=None):
+    """
+    Returns the part of the fragment keys that depends on the language and
+    on the options of the serializer.
+    """
+    return '%s:%d:%s' % (translation.get_language(), bool(use_natural_keys), indent)
+
+# the relations through which the ancestors of an object of a model can be
+# found, by model.
+_parent_links = {}
+
+def _get_parent_links(model):
+    """
+    Returns the foreign keys of ``model`` that are followed in reverse by the
+    serializer, the (model, field) of the generic relations and the many to
+    many relations pointing to ``model`` that are followed by the serializer
+    and the foreign keys pointing to ``model`` that are serialized.
+    """
+    links = _parent_links.get(model, None)
+    if links is None:
+        links = ([], [], [], [])
+        (foreign_keys, generic_relations, many_to_many, referrers) = links
+        for parent_model in get_models():
+            plan = get_serialization_plan(parent_model)
+            for (name, descriptor) in plan.foreign_key_relations:
+                if descriptor.related.model is model:
+                    foreign_keys.append(descriptor.related.field)
+            for (name, descriptor) in plan.generic_relations:
+                if descriptor.field.rel.to is model:
+                    generic_relations.append((parent_model, descriptor.field))
+            for field in plan.many_to_many:
+                if field.rel.to is model:
+                    many_to_many.append((parent_model, field))
+            for (field, is_relation, field_attrs) in plan.local_fields:
+                if is_relation and field.rel.to is model:
+                    referrers.append(field)
+
+        _parent_links[model] = links
+
+    return links
+
+def _get_parents(obj):
+    """
+    Returns the objects that contain the xml of ``obj`` in their own xml.
+    """
+    model = obj._meta.concrete_model
+    (foreign_keys, generic_relations, many_to_many, referrers) = _get_parent_links(model)
+
+    parents = []
+    for field in foreign_keys:
+        try:
+            parent = getattr(obj, field.name)
+        except ObjectDoesNotExist:
+            parent = None
+        if parent is not None:
+            parents.append(parent)
+
+    for (parent_model, field) in generic_relations:
+        content_type_field = model._meta.get_field(field.content_type_field_name)
+        if getattr(obj, content_type_field.attname) == ContentType.objects.get_for_model(parent_model).pk:
+            object_id = getattr(obj, field.object_id_field_name)
+            parents.extend(parent_model._base_manager.filter(pk=object_id))
+
+    for (parent_model, field) in many_to_many:
+        parents.extend(parent_model._base_manager.filter(**{field.name:obj.pk}))
+
+    return parents
+
+def _get_referrers(obj):
+    """
+    Returns the objects that have ``obj`` as the value of one of their
+    serialized foreign keys.
+    """
+    (foreign_keys, generic_relations, many_to_many, referrers) = _get_parent_links(obj._meta.concrete_model)
+
+    objects = []
+    for field in referrers:
+        objects.extend(field.model._base_manager.filter(**{field.name:obj}))
+    return objects
+
+def _invalidate_stored_instance(sender, instance, **kwargs):
+    """
+    Invalidates the ancestors ``instance`` had before it was changed, because
+    when it's foreign keys are changed it is moved to another place in the tree.
+    """
+    fragment_cache = get_fragment_cache()
+    if fragment_cache is not None and instance.pk is not None:
+        (foreign_keys, generic_relations, many_to_many, referrers) = _get_parent_links(instance._meta.concrete_model)
+        if foreign_keys or generic_relations:
+            for stored_instance in instance._meta.concrete_model._base_manager.filter(pk=instance.pk):
+                fragment_cache.invalidate(stored_instance)
+
+def _invalidate_instance(sender, instance, **kwargs):
+    fragment_cache = get_fragment_cache()
+    if fragment_cache is not None:
+        fragment_cache.invalidate(instance)
+
+def _invalidate_many_to_many(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    When the contents of a many to many relation change, the objects that
+    have the relation must be invalidated. These are the objects in
+    ``pk_set`` if the relation was changed from the other side.
+    """
+    fragment_cache = get_fragment_cache()
+    if fragment_cache is None:
+        return
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            fragment_cache.invalidate(instance)
+    elif action in ('post_add', 'post_remove') or action == 'pre_clear':
+        if action == 'pre_clear':
+            # after the clear the objects can not be found anymore.
+            field_names = [field.name for field in model._meta.many_to_many if field.rel.through is sender]
+            objects = model._base_manager.filter(**{field_names[0]:instance.pk})
+        else:
+            objects = model._base_manager.filter(pk__in=pk_set)
+        for obj in objects:
+            fragment_cache.invalidate(obj)
+
+def _clear_fragments(sender, **kwargs):
+    "The xml contains translations from the catalogs, which have changed."
+    fragment_cache = get_fragment_cache()
+    if fragment_cache is not None:
+        fragment_cache.clear()
+
+# the models that are part of the tree of a watched model, and all models
+# whose objects invalidate fragments when they are changed.
+_tree_models = set()
+_watched_models = set()
+
+def _watch(model):
+    "Connects the signal handlers that invalidate the fragments to ``model``."
+    # relations to models that are not loaded yet are still strings.
+    if isinstance(model, basestring) or model in _watched_models:
+        return
+
+    _watched_models.add(model)
+    pre_save.connect(_invalidate_stored_instance, sender=model,
+        dispatch_uid='easymode.tree.xml.fragments._invalidate_stored_instance')
+    post_save.connect(_invalidate_instance, sender=model,
+        dispatch_uid='easymode.tree.xml.fragments._invalidate_instance')
+    pre_delete.connect(_invalidate_instance, sender=model,
+        dispatch_uid='easymode.tree.xml.fragments._invalidate_deleted_instance')
+    m2m_changed.connect(_invalidate_many_to_many, sender=model,
+        dispatch_uid='easymode.tree.xml.fragments._invalidate_many_to_many')
+
+def watch_model(model):
+    """
+    Connects the signal handlers that invalidate the fragments to ``model``
+    and to all models that can be part of it's xml, so saving objects of
+    other models does not cost anything.
+
+    This happens automatically for models decorated with
+    :func:`~easymode.tree.xml.decorators.toxml` and for every model that is
+    looked up in the cache. Call it for any other model whose objects are
+    serialized by a different process than the one that changes them.
+    """
+    pending = [model]
+    while pending:
+        model = pending.pop()
+        if isinstance(model, basestring) or model in _tree_models:
+            continue
+
+        _tree_models.add(model)
+        _watch(model)
+
+        plan = get_serialization_plan(model)
+        pending.extend(descriptor.related.model for (name, descriptor) in plan.foreign_key_relations)
+        pending.extend(descriptor.field.rel.to for (name, descriptor) in plan.generic_relations)
+        for field in plan.many_to_many:
+            pending.append(field.rel.to)
+            _watch(field.rel.through)
+
+        # the natural keys of the objects referred to are part of the xml.
+        for (field, is_relation, field_attrs) in plan.local_fields:
+            if is_relation and hasattr(field.rel.to, 'natural_key'):
+                _watch(field.rel.to)
+
+def _get_relations(model):
+    "Returns the fields of ``model`` that relate it to another model."
+    return model._meta.fields + model._meta.many_to_many + getattr(model._meta, 'virtual_fields', [])
+
+def _watch_prepared_model(sender, **kwargs):
+    """
+    A new model class must be watched when it's objects are serialized as
+    children of a watched model, or when a relation of a watched model was
+    waiting for it.
+    """
+    # the new model class might add relations to any of the known models.
+    _parent_links.clear()
+
+    if sender._meta.concrete_model in _tree_models:
+        watch_model(sender)
+        return
+
+    for field in sender._meta.fields:
+        parent_model = getattr(field.rel, 'to', None)
+        if parent_model in _tree_models:
+            for (name, descriptor) in get_serialization_plan(parent_model).foreign_key_relations:
+                if descriptor.related.model is sender:
+                    watch_model(sender)
+                    return
+
+    for model in list(_tree_models):
+        for field in _get_relations(model):
+            rel = getattr(field, 'rel', None)
+            if rel is not None and getattr(rel, 'through', None) is sender:
+                _watch(sender)
+            elif rel is not None and rel.to is sender:
+                if field in model._meta.fields:
+                    _watch(sender)
+                else:
+                    watch_model(sender)
+
+class_prepared.connect(_watch_prepared_model,
+    dispatch_uid='easymode.tree.xml.fragments._watch_prepared_model')
+catalogs_cleared.connect(_clear_fragments,
+    dispatch_uid='easymode.tree.xml.fragments._clear_fragments')
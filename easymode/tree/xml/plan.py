@@ -0,0 +1,175 @@
+"""
+Contains the serialization plans used by
+:class:`~easymode.tree.xml.serializers.RecursiveXmlSerializer`.
+
+A plan holds all fields and relations of a model that end up in the xml,
+together with the attributes of their xml elements. It is compiled once for
+each model and set of selected fields, so the serializer does not have to
+inspect the model again for every object it serializes.
+"""
+from django.db.models.signals import class_prepared
+from django.utils.encoding import force_unicode
+from django.utils.functional import Promise
+
+from easymode.tree.introspection import get_default_field_descriptors, \
+    get_foreign_key_desciptors, get_generic_relation_descriptors
+
+
+__all__ = ('SerializationPlan', 'get_serialization_plan', 'get_field_attrs')
+
+
+def get_field_attrs(field):
+    """
+    Returns the attributes of the xml element of a field.
+
+    Fields that have an ``extra_attrs`` property get these extra attributes
+    and have the underscores in their name replaced by dots.
+
+    :param field: A field or :class:`~easymode.i18n.meta.DefaultFieldDescriptor`.
+    :rtype: A :class:`dict` with the attributes of the field element.
+    """
+    field_attrs = {
+        "name" : field.name,
+        "type" : field.get_internal_type()
+    }
+    # handle fields with a extra_attrs set as speciul
+    if hasattr(field, 'extra_attrs'):
+        if field.extra_attrs:
+            for (key, value) in field.extra_attrs.iteritems():
+                field_attrs[key] = force_unicode(value)
+
+        field_attrs['name'] = field.name.replace('_', '.')
+
+    return field_attrs
+
+def _compile_field_attrs(field):
+    """
+    Returns the attributes of the xml element of a field, or None if they
+    can not be computed in advance because they contain lazy translations.
+    """
+    extra_attrs = getattr(field, 'extra_attrs', None)
+    if extra_attrs:
+        for value in extra_attrs.itervalues():
+            if isinstance(value, Promise):
+                return None
+
+    return get_field_attrs(field)
+
+class SerializationPlan(object):
+    """
+    All fields and relations of ``model`` that are serialized, in the order
+    in which they are written to the xml.
+
+    .. attribute:: local_fields
+
+        (field, is_relation, field_attrs) for each field in the model's
+        ``local_fields``. ``field_attrs`` is None for foreign keys and for
+        fields whose attributes must be computed when serializing.
+
+    .. attribute:: foreign_key_relations
+
+        (name, descriptor) of the reverse foreign keys that are followed.
+
+    .. attribute:: generic_relations
+
+        (name, descriptor) of the generic relations that are followed.
+
+    .. attribute:: default_fields
+
+        (descriptor, field_attrs) of the localized fields.
+
+    .. attribute:: default_field_names
+
+        The names of the localized fields in ``default_fields``.
+
+    .. attribute:: many_to_many
+
+        The :class:`~django.db.models.ManyToManyField` that are followed.
+
+    :param model: A model class.
+    :param selected_fields: The names of the fields that should be serialized,\
+        or None if all fields should be serialized.
+    """
+
+    def __init__(self, model, selected_fields=None):
+        self.model = model
+        self.selected_fields = selected_fields
+
+        self.local_fields = []
+        for field in model._meta.local_fields:
+            if field.serialize and getattr(field, 'include_in_xml', True):
+                if field.rel is None:
+                    if selected_fields is None or field.attname in selected_fields:
+                        self.local_fields.append((field, False, _compile_field_attrs(field)))
+                else:
+                    if selected_fields is None or field.attname[:-3] in selected_fields:
+                        self.local_fields.append((field, True, None))
+
+        # don't follow foreign keys that have a 'nofollow' attribute
+        self.foreign_key_relations = []
+        for (name, descriptor) in get_foreign_key_desciptors(model):
+            if descriptor.related.field.serialize \
+                and not hasattr(descriptor.related.field, 'nofollow'):
+                self.foreign_key_relations.append((name, descriptor))
+
+        # generic relations always have serialize set to False so we always include them.
+        self.generic_relations = list(get_generic_relation_descriptors(model))
+
+        self.default_fields = []
+        for (name, descriptor) in get_default_field_descriptors(model):
+            if descriptor.serialize:
+                self.default_fields.append((descriptor, _compile_field_attrs(descriptor)))
+        self.default_field_names = [descriptor.name for (descriptor, field_attrs) in self.default_fields]
+
+        # many to many relations are only followed when there is no custom
+        # through model.
+        self.many_to_many = []
+        for field in model._meta.many_to_many:
+            if field.serialize and field.rel.through._meta.auto_created:
+                if selected_fields is None or field.attname in selected_fields:
+                    self.many_to_many.append(field)
+
+    @property
+    def prefetch_lookups(self):
+        """
+        The names of all relations that are followed, which can be passed to
+        ``prefetch_related``.
+        """
+        lookups = [name for (name, descriptor) in self.foreign_key_relations]
+        lookups += [name for (name, descriptor) in self.generic_relations]
+        lookups += [field.name for field in self.many_to_many]
+        return lookups
+
+# plans by (model, selected_fields)
+_plans = {}
+
+def get_serialization_plan(model, selected_fields=None):
+    """
+    Returns the :class:`SerializationPlan` for ``model``, which is only
+    compiled the first time it is requested.
+
+    :param model: A model class.
+    :param selected_fields: The names of the fields that should be serialized,\
+        or None if all fields should be serialized.
+    :rtype: A :class:`SerializationPlan`
+    """
+    if selected_fields is not None and not isinstance(selected_fields, frozenset):
+        selected_fields = frozenset(selected_fields)
+
+    key = (model, selected_fields)
+    plan = _plans.get(key, None)
+    if plan is None:
+        plan = SerializationPlan(model, selected_fields)
+        _plans[key] = plan
+
+    return plan
+
+def _invalidate_plans(sender, **kwargs):
+    """
+    A new model class might add relations to any of the models that
+    allready have a plan, so they must all be compiled again.
+    """
+    _plans.clear()
+
+class_prepared.connect(_invalidate_plans,
+    dispatch_uid='easymode.tree.xml.plan._invalidate_plans')
@@ -0,0 +1,88 @@
+"""
+Contains the machinery to load a whole model tree with a fixed number of
+queries per level, before it is serialized by
+:class:`~easymode.tree.xml.serializers.RecursiveXmlSerializer`.
+
+Without prefetching the serializer would need a query for every relation of
+every object in the tree. :func:`prefetch_tree` walks the tree one level at
+a time instead and uses django's prefetch_related machinery to load all the
+children of a level with one ``IN (...)`` query per relation.
+"""
+from django.db.models.query import prefetch_related_objects
+
+from easymode.tree.xml.plan import get_serialization_plan
+
+
+__all__ = ('get_prefetch_lookups', 'prefetch_tree')
+
+
+def get_prefetch_lookups(model, selected_fields=None):
+    """
+    Returns the names of all the relations in ``model`` that are followed by
+    the serializer, as compiled in it's
+    :class:`~easymode.tree.xml.plan.SerializationPlan`.
+
+    :param model: A model class.
+    :param selected_fields: The names of the fields that are serialized, or\
+        None if all fields are serialized.
+    :rtype: A :class:`list` of names that can be passed to ``prefetch_related``.
+    """
+    return get_serialization_plan(model, selected_fields).prefetch_lookups
+
+def prefetch_tree(objects, selected_fields=None):
+    """
+    Loads all descendants of ``objects`` into django's prefetch cache, so
+    the serializer can get all children without doing any queries.
+
+    The tree is loaded level by level, so the number of queries depends on
+    the depth of the tree and not on the number of objects in it. Objects
+    that implement their own ``__serialize__`` method are not expanded,
+    because the serializer does not follow their relations either.
+
+    usage::
+
+        objects = list(Foo.objects.all())
+        prefetch_tree(objects)
+
+        # no queries will be done now.
+        for foo in objects:
+            for bar in foo.bars.all():
+                print bar
+
+    :param objects: A :class:`list` of model instances, which may be of\
+        different types.
+    :param selected_fields: The names of the fields of ``objects`` that are\
+        serialized, or None if all fields are serialized. Like the serializer,\
+        this only applies to ``objects`` and not to their descendants.
+    """
+    # objects that where allready expanded, by (model, pk). When the same
+    # object is found more than once in the tree it shares the prefetch
+    # cache of the one that was expanded first, which also makes sure
+    # cycles in the data can not make us loop forever.
+    expanded = {}
+
+    level = objects
+    while level:
+        instances_by_model = {}
+        for obj in level:
+            model = obj.__class__
+            if hasattr(model, '__serialize__'):
+                continue
+
+            key = (model, obj.pk)
+            if key in expanded:
+                obj._prefetched_objects_cache = expanded[key]._prefetched_objects_cache
+            else:
+                if not hasattr(obj, '_prefetched_objects_cache'):
+                    obj._prefetched_objects_cache = {}
+                expanded[key] = obj
+                instances_by_model.setdefault(model, []).append(obj)
+
+        level = []
+        for (model, instances) in instances_by_model.iteritems():
+            for lookup in get_prefetch_lookups(model, selected_fields):
+                prefetch_related_objects(instances, [lookup])
+                for instance in instances:
+                    level.extend(getattr(instance, lookup).all())
+        # the descendants are serialized with all their fields.
+        selected_fields = None
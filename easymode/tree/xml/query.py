@@ -6,6 +6,7 @@ from itertools import chain
 
 from django.db import models
 from django.db.models.query import QuerySet
+from easymode.i18n.query import LocalizedQuerySet
 from easymode.tree.xml.serializers import RecursiveXmlSerializer
 
 class QuerySetManager(models.Manager):
@@ -22,7 +23,7 @@ class QuerySetManager(models.Manager):
 
     def get_query_set(self):
         """manager will return the custom queryset"""
-        return self.queryset_class(self.model)
+        return self.queryset_class(self.model, using=self._db)
 
     def __getattr__(self, attr, *args):
         try:
@@ -40,6 +41,23 @@ class XmlSerializableQuerySet(QuerySet):
         ser = RecursiveXmlSerializer()
         return ser.serialize(self)
 
+    def __iterxml__(self):
+        """turn querysets into xml recursively, in chunks"""
+        ser = RecursiveXmlSerializer()
+        return ser.iterserialize(self)
+
+    def __element_tree__(self):
+        """turn querysets into an lxml element tree recursively"""
+        ser = RecursiveXmlSerializer()
+        return ser.serialize_tree(self)
+
+class LocalizedXmlSerializableQuerySet(XmlSerializableQuerySet, LocalizedQuerySet):
+    """
+    The queryset of models that are decorated with both
+    :func:`~easymode.tree.xml.decorators.toxml` and
+    :class:`~easymode.i18n.decorators.I18n`.
+    """
+
 class XmlQuerySetChain(list):
     """
     Can be used to combine multiple querysets and turn them into
@@ -68,5 +86,15 @@ class XmlQuerySetChain(list):
         """turn querysets into xml recursively"""
         ser = RecursiveXmlSerializer()
         return ser.serialize(self)
+
+    def __iterxml__(self):
+        """turn querysets into xml recursively, in chunks"""
+        ser = RecursiveXmlSerializer()
+        return ser.iterserialize(self)
+
+    def __element_tree__(self):
+        """turn querysets into an lxml element tree recursively"""
+        ser = RecursiveXmlSerializer()
+        return ser.serialize_tree(self)
     
     
\ No newline at end of file
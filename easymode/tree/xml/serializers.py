@@ -3,16 +3,20 @@ Contains an instance of Serializer and extends it to allow for recusive
 serialization of django models with foreign keys.
 """
 import sys
+from itertools import islice
 from StringIO import StringIO
 
 from django.conf import settings
 from django.core.serializers import xml_serializer
-from django.utils.encoding import smart_unicode, force_unicode
+from django.db.models.query import QuerySet
+from django.utils.encoding import smart_unicode
 
-from easymode.tree.introspection import get_default_field_descriptors, \
-    get_foreign_key_desciptors, get_generic_relation_descriptors
+from easymode.i18n.meta.fields import get_localized_values
+from easymode.tree.xml.fragments import get_fragment_cache, get_variant
+from easymode.tree.xml.plan import get_serialization_plan, get_field_attrs
+from easymode.tree.xml.prefetch import prefetch_tree
 from easymode.utils import recursion_depth
-from easymode.utils.xmlutils import XmlPrinter
+from easymode.utils.xmlutils import XmlPrinter, XmlTreeBuilder, etree
 
 
 MANY_TO_MANY_RECURSION_LIMIT_ERROR = """
@@ -37,6 +41,43 @@ def startDocumentOnlyOnce(self):
 
 XmlPrinter.startDocument = startDocumentOnlyOnce
 
+# The number of objects for which the tree is loaded at once, when
+# serializing with RecursiveXmlSerializer.iterserialize.
+STREAMING_BATCH_SIZE = 100
+
+def _objects(queryset, batch_size=None, prefetch=True, fragments=None, variant=None, selected_fields=None):
+    """
+    Yields (obj, fragment_key, fragment) for the objects in ``queryset``.
+
+    The objects are handled ``batch_size`` at a time, or all at once if
+    ``batch_size`` is None. For each batch the fragments are looked up in the
+    :class:`~easymode.tree.xml.fragments.FragmentCache` ``fragments`` and,
+    if ``prefetch`` is True, the trees of the objects that where not found
+    are loaded, following only the relations in ``selected_fields``. Without
+    ``fragments``, fragment_key and fragment are None.
+    """
+    if batch_size and isinstance(queryset, QuerySet):
+        # don't let the queryset cache all objects
+        objects = queryset.iterator()
+    else:
+        objects = iter(queryset)
+
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            break
+
+        if fragments is not None:
+            cached = fragments.get_many(batch, variant)
+        else:
+            cached = [(None, None)] * len(batch)
+
+        if prefetch:
+            prefetch_tree([obj for (obj, (key, fragment)) in zip(batch, cached) if fragment is None], selected_fields)
+
+        for (obj, (key, fragment)) in zip(batch, cached):
+            yield (obj, key, fragment)
+
 class RecursiveXmlSerializer(xml_serializer.Serializer):
     """
     Serializes a queryset including related fields
@@ -45,49 +86,159 @@ class RecursiveXmlSerializer(xml_serializer.Serializer):
         """
         Serialize a queryset.
         THE OUTPUT OF THIS SERIALIZER IS NOT MEANT TO BE SERIALIZED BACK
-        INTO THE DB.        
+        INTO THE DB.
+
+        Unless ``prefetch=False`` is passed, the entire tree is loaded before
+        serialization starts, using :func:`~easymode.tree.xml.prefetch.prefetch_tree`.
+        When ``batch_size`` is passed, the tree is loaded for that many
+        objects in ``queryset`` at a time instead.
+
+        When :ref:`xml_fragment_cache` is configured, the xml of each object
+        in ``queryset``, including it's descendants, is taken from the
+        :class:`~easymode.tree.xml.fragments.FragmentCache` if possible. Only
+        the top level objects are looked up in the cache, so a batch of
+        objects costs a single round trip. Pass ``fragments=False`` to bypass
+        the cache.
+        """
+        for finished in self._serialize(queryset, options):
+            pass
+        return self.getvalue()
+
+    def iterserialize(self, queryset, **options):
+        """
+        Serialize a queryset, but instead of returning the document, yield
+        it in chunks. A chunk is produced each time an object in ``queryset``
+        is serialized, together with all it's descendants.
+
+        The trees of the objects in ``queryset`` are loaded ``batch_size``
+        objects at a time (:data:`STREAMING_BATCH_SIZE` by default), so the
+        memory used does not depend on the size of ``queryset``.
+
+        usage::
+
+            from django.http import StreamingHttpResponse
+
+            ser = RecursiveXmlSerializer()
+            chunks = ser.iterserialize(Foo.objects.all())
+            return StreamingHttpResponse(chunks, content_type='text/xml')
+        """
+        buffer = StringIO()
+        options['stream'] = buffer
+        options.setdefault('batch_size', STREAMING_BATCH_SIZE)
+
+        for finished in self._serialize(queryset, options):
+            chunk = buffer.getvalue()
+            if chunk:
+                buffer.seek(0)
+                buffer.truncate()
+                yield chunk
+
+    def serialize_tree(self, queryset, **options):
+        """
+        Serialize a queryset into an `lxml <http://codespeak.net/lxml/>`_
+        element tree, using :class:`~easymode.utils.xmlutils.XmlTreeBuilder`.
+
+        The tree is exactly the same as the result of parsing the xml
+        produced by :meth:`serialize`, but it is built without creating the
+        xml string first. This requires lxml.
+
+        :rtype: :class:`lxml.etree._ElementTree`
+        """
+        options['tree'] = True
+        for finished in self._serialize(queryset, options):
+            pass
+        return etree.ElementTree(self.xml.root)
+
+    def _serialize(self, queryset, options):
+        """
+        Writes ``queryset`` to the stream and yields each time an object in
+        ``queryset`` is finished.
         """
         self.options = options
 
         self.stream = options.get("stream", StringIO())
         self.selected_fields = options.get("fields")
+        if self.selected_fields is not None:
+            self.selected_fields = frozenset(self.selected_fields)
         self.use_natural_keys = options.get("use_natural_keys", True)
         
         self.xml = options.get("xml", None)
         self.root = (self.xml == None)
-        
+
+        self.fragments = options.get("fragments", None)
+        if self.fragments is None:
+            self.fragments = get_fragment_cache()
+        elif self.fragments is False:
+            self.fragments = None
+
+        # the fragments of the top level objects only contain the selected fields.
+        if self.fragments is not None and self.selected_fields is None:
+            fragments = self.fragments
+            variant = get_variant(self.use_natural_keys, options.get("indent", None))
+        else:
+            fragments = variant = None
+
+        # load the trees of the objects in queryset, the serializers for the
+        # child objects will find them in the prefetch cache.
+        objects = _objects(queryset,
+            batch_size=options.get("batch_size", None) if self.root else None,
+            prefetch=self.root and options.get("prefetch", True),
+            fragments=fragments,
+            variant=variant,
+            selected_fields=self.selected_fields)
+
         self.start_serialization()
-        for obj in queryset:
+        yield
+        for (obj, fragment_key, fragment) in objects:
+            if fragment is not None:
+                # write the cached xml as is.
+                self.xml.insertFragment(fragment)
             # hook for having custom serialization
-            if hasattr(obj, '__serialize__'):
+            elif hasattr(obj, '__serialize__'):
                 obj.__serialize__(self.xml)
+            elif fragment_key is not None:
+                self.serialize_fragment(obj, fragment_key)
             else:
                 self.serialize_object(obj)
+            yield
         self.end_serialization()
-        return self.getvalue()
-    
+        yield
+
+    def serialize_fragment(self, obj, fragment_key):
+        """
+        Serializes ``obj`` like :meth:`serialize_object`, and stores the xml
+        in the fragment cache under ``fragment_key``.
+        """
+        fragment_stream = StringIO()
+        xml = self.xml
+        self.xml = XmlPrinter(fragment_stream, 'utf-8')
+        try:
+            self.serialize_object(obj)
+        finally:
+            self.xml = xml
+
+        fragment = fragment_stream.getvalue().decode('utf-8')
+        self.fragments.set(fragment_key, fragment)
+        self.xml.insertFragment(fragment)
+
     def serialize_object(self, obj):
         """
         Write one item to the object stream
         """
+        plan = get_serialization_plan(obj.__class__, self.selected_fields)
+
         self.start_object(obj)
-        for field in obj._meta.local_fields:
-            if field.serialize and getattr(field, 'include_in_xml', True):
-                if field.rel is None:
-                    if self.selected_fields is None or field.attname in self.selected_fields:
-                        self.handle_field(obj, field)
-                else:
-                    if self.selected_fields is None or field.attname[:-3] in self.selected_fields:
-                        self.handle_fk_field(obj, field)
+        for (field, is_relation, field_attrs) in plan.local_fields:
+            if is_relation:
+                self.handle_fk_field(obj, field)
+            else:
+                self.handle_field(obj, field, field_attrs)
 
         # recursively serialize all foreign key relations
-        for (foreign_key_descriptor_name, foreign_key_descriptor ) in get_foreign_key_desciptors(obj):
-            # don't follow foreign keys that have a 'nofollow' attribute
-            if foreign_key_descriptor.related.field.serialize \
-                and not hasattr(foreign_key_descriptor.related.field, 'nofollow'):
-                bound_foreign_key_descriptor = foreign_key_descriptor.__get__(obj)
-                s = RecursiveXmlSerializer()                
-                s.serialize( bound_foreign_key_descriptor.all(), xml=self.xml, stream=self.stream)
+        for (foreign_key_descriptor_name, foreign_key_descriptor) in plan.foreign_key_relations:
+            bound_foreign_key_descriptor = foreign_key_descriptor.__get__(obj)
+            s = RecursiveXmlSerializer()
+            s.serialize( bound_foreign_key_descriptor.all(), xml=self.xml, stream=self.stream, fragments=False)
 
         #recursively serialize all one to one relations
         # TODO: make this work for non abstract inheritance but without infinite recursion
@@ -103,21 +254,19 @@ class RecursiveXmlSerializer(xml_serializer.Serializer):
         #     s.serialize( related_objects, xml=self.xml, stream=self.stream)
 
         # add generic relations
-        for (generic_relation_descriptor_name, generic_relation_descriptor) in get_generic_relation_descriptors(obj):
-            # generic relations always have serialize set to False so we always include them.
+        for (generic_relation_descriptor_name, generic_relation_descriptor) in plan.generic_relations:
             bound_generic_relation_descriptor = generic_relation_descriptor.__get__(obj)
-            s = RecursiveXmlSerializer()                
-            s.serialize( bound_generic_relation_descriptor.all(), xml=self.xml, stream=self.stream)
-        
-        #serialize the default field descriptors:
-        for (default_field_descriptor_name, default_field_descriptor) in get_default_field_descriptors(obj):
-            if default_field_descriptor.serialize:
-                self.handle_field(obj, default_field_descriptor)
-        
-        for field in obj._meta.many_to_many:
-            if field.serialize:
-                if self.selected_fields is None or field.attname in self.selected_fields:
-                    self.handle_m2m_field(obj, field)
+            s = RecursiveXmlSerializer()
+            s.serialize( bound_generic_relation_descriptor.all(), xml=self.xml, stream=self.stream, fragments=False)
+
+        #serialize the default field descriptors, which are looked up at once:
+        if plan.default_field_names:
+            get_localized_values(obj, plan.default_field_names)
+        for (default_field_descriptor, field_attrs) in plan.default_fields:
+            self.handle_field(obj, default_field_descriptor, field_attrs)
+
+        for field in plan.many_to_many:
+            self.handle_m2m_field(obj, field)
         self.end_object(obj)
         
     def start_serialization(self):
@@ -125,7 +274,10 @@ class RecursiveXmlSerializer(xml_serializer.Serializer):
         Start serialization -- open the XML document and the root element.
         """
         if (self.root):
-            self.xml = XmlPrinter(self.stream, self.options.get("encoding", settings.DEFAULT_CHARSET))
+            if self.options.get("tree", False):
+                self.xml = XmlTreeBuilder()
+            else:
+                self.xml = XmlPrinter(self.stream, self.options.get("encoding", settings.DEFAULT_CHARSET))
             self.xml.startDocument()
             self.xml.startElement("django-objects", {"version" : "1.0"})
 
@@ -140,24 +292,19 @@ class RecursiveXmlSerializer(xml_serializer.Serializer):
             self.xml.endDocument()
 
 
-    def handle_field(self, obj, field):
+    def handle_field(self, obj, field, field_attrs=None):
         """
         Called to handle each field on an object (except for ForeignKeys and
         ManyToManyFields)
+
+        ``field_attrs`` are the attributes of the field element, as compiled
+        in the :class:`~easymode.tree.xml.plan.SerializationPlan`. When
+        omitted they are computed using :func:`~easymode.tree.xml.plan.get_field_attrs`.
         """
         self.indent(2)
 
-        field_attrs = {
-            "name" : field.name,
-            "type" : field.get_internal_type()
-        }
-        # handle fields with a extra_attrs set as speciul
-        if hasattr(field, 'extra_attrs'):
-            if field.extra_attrs:
-                for (key, value) in field.extra_attrs.iteritems():
-                    field_attrs[key] = force_unicode(value)
-
-            field_attrs['name'] = field.name.replace('_', '.')
+        if field_attrs is None:
+            field_attrs = get_field_attrs(field)
 
         self.xml.startElement("field", field_attrs)
 
@@ -222,6 +369,6 @@ class RecursiveXmlSerializer(xml_serializer.Serializer):
                 self._start_relational_field(field)
 
                 s = RecursiveXmlSerializer()
-                s.serialize( getattr(obj, field.name).iterator(), xml=self.xml, stream=self.stream)
+                s.serialize( getattr(obj, field.name).all(), xml=self.xml, stream=self.stream, fragments=False)
 
                 self.xml.endElement("field")
@@ -2,15 +2,106 @@
 Lots of utility functions that can be used when
 implementing a multi lingual django app.
 """
-import re
+import threading
 
 from django.conf import settings
 from django.utils.translation import get_language, to_locale
 
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
 
 USE_SHORT_LANGUAGE_CODES = getattr(settings, 'USE_SHORT_LANGUAGE_CODES', False)
 
 
+class LanguageRegistry(object):
+    """
+    The language codes of the site, with the tables derived from them, so
+    they do not have to be computed each time they are needed. Use
+    :func:`get_language_registry` to get the registry of the current settings.
+
+    >>> from easymode.utils.languagecode import get_language_registry
+    >>> languages = settings.LANGUAGES
+    >>> settings.LANGUAGES = (('en-us','English'),('de','German'),)
+    >>> registry = get_language_registry()
+    >>> registry.codes_by_shorthand['en']
+    'en-us'
+    >>> registry.languages_by_prefix['en-us']
+    'en-us'
+    >>> settings.LANGUAGES = languages
+    """
+    def __init__(self):
+        self.languages = settings.LANGUAGES
+        self.use_short_language_codes = getattr(settings, 'USE_SHORT_LANGUAGE_CODES', False)
+
+        #: the codes in ``settings.LANGUAGES``.
+        self.language_codes = tuple(dict(self.languages).keys())
+        #: the codes without the country, like ``'en'`` for ``'en-us'``.
+        self.short_language_codes = tuple(set(code[:2] for code in self.language_codes))
+        #: the codes in ``settings.LANGUAGES`` and ``settings.MSGID_LANGUAGE``.
+        self.all_language_codes = self.language_codes
+        msgid_language = getattr(settings, 'MSGID_LANGUAGE', None)
+        if msgid_language is not None and msgid_language not in self.language_codes:
+            self.all_language_codes = (msgid_language,) + self.language_codes
+
+        #: the code used in urls for each code, see :func:`get_shorthand_from_language_code`.
+        self.shorthands = dict((code, code[:2] if self.use_short_language_codes else code)
+            for code in self.language_codes)
+        #: the first code in ``settings.LANGUAGES`` for each short code.
+        self.codes_by_shorthand = {}
+        for code in self.language_codes:
+            self.codes_by_shorthand.setdefault(code[:2], code)
+
+        self.language_codes_as_disjunction = "|".join(self.shorthands[code]
+            for code in self.language_codes)
+
+        #: the language code for each prefix that can start the path of an url.
+        if self.use_short_language_codes:
+            self.languages_by_prefix = dict(self.codes_by_shorthand)
+        else:
+            self.languages_by_prefix = dict((code, code) for code in self.language_codes)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_language_registry():
+    """
+    Returns the :class:`LanguageRegistry` of the current settings. It is
+    created the first time it is needed and again after the language
+    settings have changed, see :func:`reset_language_registry`.
+    """
+    registry = _registry
+    # settings.LANGUAGES can be replaced without sending setting_changed.
+    if registry is None or registry.languages is not settings.LANGUAGES:
+        registry = _create_language_registry()
+    return registry
+
+def _create_language_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None or _registry.languages is not settings.LANGUAGES:
+            _registry = LanguageRegistry()
+        return _registry
+
+def reset_language_registry():
+    """
+    Discards the :class:`LanguageRegistry`, so it is created again from the
+    settings the next time it is needed. This happens automatically when
+    one of the language settings is changed with django's ``override_settings``.
+    """
+    global _registry
+    _registry = None
+
+def _reset_language_registry(sender, setting, **kwargs):
+    if setting in ('LANGUAGES', 'LANGUAGE_CODE', 'MSGID_LANGUAGE', 'USE_SHORT_LANGUAGE_CODES'):
+        reset_language_registry()
+
+setting_changed.connect(_reset_language_registry,
+    dispatch_uid='easymode.utils.languagecode._reset_language_registry')
+
+
 def get_language_codes():
     """
     Retrieves all the language codes defined in ``settings.LANGUAGES``.
@@ -21,7 +112,7 @@ def get_language_codes():
     
     :rtype: A :class:`list` of language codes.
     """
-    return dict(settings.LANGUAGES).keys()
+    return list(get_language_registry().language_codes)
     
 def get_short_language_codes():
     """
@@ -34,15 +125,7 @@ def get_short_language_codes():
     
     :rtype: A :class:`list` of short versions of the language codes.
     """
-    languages = set([lang[:2] for lang in get_language_codes()])
-    return list(languages)
-
-# define regular expressions. they are different, depending on whether we are using full language
-# codes, eg 'en-us' or we want to show the abbreviated versions in the url, eg. 'en'
-if USE_SHORT_LANGUAGE_CODES:
-    STRIP_LANGUAGE_CODE_REGEX = re.compile(ur'/(?:%s)/' % "|".join(get_short_language_codes()))
-else:
-    STRIP_LANGUAGE_CODE_REGEX = re.compile(ur'/(?:%s)/' % "|".join(get_language_codes()))
+    return list(get_language_registry().short_language_codes)
 
 def get_all_language_codes():
     """
@@ -57,12 +140,7 @@ def get_all_language_codes():
     
     :rtype: A :class:`list` of language codes.
     """
-    languages = get_language_codes()
-    if hasattr(settings, 'MSGID_LANGUAGE'):
-        if not settings.MSGID_LANGUAGE in languages:
-            languages.insert(0, settings.MSGID_LANGUAGE)
-            
-    return languages
+    return list(get_language_registry().all_language_codes)
 
 def get_shorthand_from_language_code(locale):
     """
@@ -82,10 +160,13 @@ def get_shorthand_from_language_code(locale):
     :param locale: The language code as a :class:`unicode` string.
     :rtype: The short version of the language code (when appropriate).
     """
-    if USE_SHORT_LANGUAGE_CODES:
-        return locale[:2]
-        
-    return locale
+    registry = get_language_registry()
+    try:
+        return registry.shorthands[locale]
+    except KeyError:
+        if registry.use_short_language_codes:
+            return locale[:2]
+        return locale
 
 def get_language_code_from_shorthand(short_locale):
     """
@@ -98,14 +179,37 @@ def get_language_code_from_shorthand(short_locale):
     :param short_locale: The short version of a language code.
     :rtype: The long version of the language code.
     """
-    for locale in get_language_codes():
-        if locale[:2] == short_locale:
-            return locale
-    return settings.LANGUAGE_CODE
+    return get_language_registry().codes_by_shorthand.get(short_locale, settings.LANGUAGE_CODE)
     
+def split_language_prefix(path):
+    """
+    Finds the language code that is the first part of ``path``. When
+    ``settings.USE_SHORT_LANGUAGE_CODES`` is ``True`` the first part is a
+    short code, and the language code in ``settings.LANGUAGES`` it belongs
+    to is returned.
+
+    The prefix is looked up in a table of the :class:`LanguageRegistry`, so
+    it does not matter how many languages there are.
+
+    >>> split_language_prefix('/de/example.html')
+    ('de', '/example.html')
+    >>> split_language_prefix('/example.html')
+    (None, '/example.html')
+
+    :param path: The path of an url, starting with a slash.
+    :rtype: A tuple of the language code, or ``None`` if the path does not\
+        start with one, and the path without the language code.
+    """
+    end = path.find('/', 1)
+    if end != -1 and path.startswith('/'):
+        language = get_language_registry().languages_by_prefix.get(path[1:end], None)
+        if language is not None:
+            return (language, path[end:])
+    return (None, path)
+
 def strip_language_code(url):
     """
-    Strip the language code from the beginning of string
+    Strip the language code from the beginning of the path of ``url``.
 
     >>> strip_language_code('http://example.com/en/example.html')
     'http://example.com/example.html'
@@ -113,7 +217,19 @@ def strip_language_code(url):
     :param url: An url.
     :rtype: The ``url`` but the language code is removed.
     """
-    return STRIP_LANGUAGE_CODE_REGEX.sub('/',url, 1)
+    # the path of an url with a host starts at the first slash after the host.
+    start = url.find('://')
+    if start == -1:
+        start = 0
+    else:
+        start = url.find('/', start + 3)
+        if start == -1:
+            return url
+
+    (language, path) = split_language_prefix(url[start:])
+    if language is None:
+        return url
+    return url[:start] + path
 
 def fix_language_code(url, current_language):
     """
@@ -175,6 +291,51 @@ def get_real_fieldname(field, lang):
     """
     return str('%s_%s' % (field, to_locale(lang).lower()))
 
+class LocalizedColumns(dict):
+    """
+    An immutable table of the real names of internationalised fields, by
+    (field, language), so they do not have to be computed by
+    :func:`get_real_fieldname` each time they are needed.
+
+    Each model decorated with :class:`~easymode.i18n.decorators.I18n` has one
+    of these as it's ``localized_columns`` attribute.
+
+    >>> columns = LocalizedColumns(['name'], ['en-us', 'de'])
+    >>> columns[('name', 'en-us')]
+    'name_en_us'
+
+    Names of languages that are not in the table are computed by
+    :func:`get_real_fieldname`.
+
+    :param fields: A :class:`list` of the names of the internationalised fields.
+    :param languages: A :class:`list` of the language codes that are put in the table.
+    """
+    def __init__(self, fields, languages):
+        # not super, this module is reloaded by the tests, which would make
+        # the tables of the models instances of an older class.
+        dict.__init__(self, (
+            ((field, language), get_real_fieldname(field, language))
+            for field in fields for language in languages
+        ))
+        self.fields = frozenset(fields)
+
+    def __missing__(self, key):
+        return get_real_fieldname(*key)
+
+    def __reduce__(self):
+        return (_rebuild_localized_columns, (dict(self), tuple(self.fields)))
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("LocalizedColumns can not be modified")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+def _rebuild_localized_columns(columns, fields):
+    "Used to copy and unpickle a :class:`LocalizedColumns`."
+    localized_columns = LocalizedColumns(fields, ())
+    dict.update(localized_columns, columns)
+    return localized_columns
+
 def localize_fieldnames(fields, internationalized_fields):
     """
     Given a list of fields and a list of field names that
@@ -187,16 +348,23 @@ def localize_fieldnames(fields, internationalized_fields):
     ['name', 'title_en_us', 'url']
     
     :param fields: A :class:`list` af field names.
-    :param internationalized_fields: A list of fields names, these fields are internationalized.
+    :param internationalized_fields: A list of fields names, these fields are\
+        internationalized, or the :class:`LocalizedColumns` of a model.
     :rtype: A list with the actual field names that are used in the current language.
     """
+    # a LocalizedColumns, which might be of an older version of the class.
+    if isinstance(internationalized_fields, dict) and hasattr(internationalized_fields, 'fields'):
+        columns = internationalized_fields
+    else:
+        columns = LocalizedColumns(internationalized_fields, ())
+
     result = []
-    lang = get_language()    
+    lang = get_language()
     for field in fields:
-        if field in internationalized_fields:
-            result.append(get_real_fieldname(field, lang))
+        if field in columns.fields:
+            result.append(columns[(field, lang)])
         else:
-            result.append(field)    
+            result.append(field)
     return result
 
 def get_language_codes_as_disjunction():
@@ -217,6 +385,4 @@ def get_language_codes_as_disjunction():
         )
         
     """
-    language_codes = map(get_shorthand_from_language_code, get_language_codes())
-    languages = "|".join(language_codes)
-    return languages
+    return get_language_registry().language_codes_as_disjunction
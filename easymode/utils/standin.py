@@ -1,9 +1,12 @@
 from types import NoneType
 from django.utils.text import capfirst
 
-__all__ = ('standin_for',)
+__all__ = ('standin_for', 'standin_with_attributes')
 
 _defined_standins = dict()
+
+# the types created by standin_with_attributes, by base type.
+_attribute_standins = dict()
     
 def standin_for(obj, **attrs):
     """
@@ -119,4 +122,84 @@ def standin_for(obj, **attrs):
     return stand_in
     
 def _standin_with_dict_for(obj, attrs):
-    return standin_for(obj, **attrs)
\ No newline at end of file
+    return standin_for(obj, **attrs)
+
+def _get_standin_attribute(self, name):
+    "Looks up attributes that are not found on the standin in it's ``standin_attributes``."
+    if name == 'standin_attributes':
+        raise AttributeError(name)
+    return getattr(self.standin_attributes, name)
+
+def _reduce_standin(self, ignore=None):
+    return (_standin_with_attributes_for, (self.__class__.__bases__[0](self), self.standin_attributes))
+
+def _get_attribute_standin_type(obj_class):
+    """
+    Returns the type used by :func:`standin_with_attributes` for instances
+    of ``obj_class``, which is created only once.
+    """
+    cached_type = _attribute_standins.get(obj_class, None)
+    if cached_type is None:
+        cls_attrs = {
+            '__slots__': ('standin_attributes',),
+            '__getattr__': _get_standin_attribute,
+            '__reduce__': _reduce_standin,
+            '__reduce_ex__': _reduce_standin,
+        }
+        id = "%sStandIn" % obj_class.__name__
+        try:
+            cached_type = type(id, (obj_class, object), cls_attrs)
+        except TypeError:
+            # types like str and long can not have slots, so the attributes
+            # are stored in the __dict__ instead.
+            del cls_attrs['__slots__']
+            cached_type = type(id, (obj_class, object), cls_attrs)
+        _attribute_standins[obj_class] = cached_type
+
+    return cached_type
+
+def standin_with_attributes(obj, attributes):
+    """
+    Returns an object that can be used as a standin for the original object,
+    which has all attributes of ``attributes`` as well.
+
+    This does the same as :func:`standin_for`, but there is only one standin
+    type for each type of ``obj``, which keeps ``attributes`` in a single
+    slot. This makes it a lot cheaper when many standins are created.
+
+    >>> class Origin(object):
+    ...     origin = 'outerspace'
+    >>> a = u'I am E.T.'
+    >>> b = standin_with_attributes(a, Origin())
+    >>> b == a
+    True
+    >>> b.origin
+    'outerspace'
+    >>> type(b)
+    <class 'easymode.utils.standin.unicodeStandIn'>
+
+    Just like :func:`standin_for`, :class:`bool` and :class:`~types.NoneType`
+    instances are returned unmodified.
+
+    :param obj: An instance of some class
+    :param attributes: An object whose attributes are added to the standin for *obj*.\
+        It must be possible to pickle it if the standin needs to be pickled.
+    :rtype: A new object that can be used where the original was used. However it has extra attributes.
+    """
+    obj_class = obj.__class__
+    if obj_class is bool or obj_class is NoneType:
+        return obj
+
+    try:
+        stand_in = _get_attribute_standin_type(obj_class)(obj)
+    except (AttributeError, TypeError):
+        # the type can not be constructed from an instance, so let
+        # standin_for try harder.
+        return standin_for(obj, **dict((name, getattr(attributes, name))
+            for name in dir(attributes) if not name.startswith('_')))
+
+    stand_in.standin_attributes = attributes
+    return stand_in
+
+def _standin_with_attributes_for(obj, attributes):
+    return standin_with_attributes(obj, attributes)
@@ -2,11 +2,49 @@ from django.conf import settings
 from django.template import TemplateDoesNotExist
 from django.template.loader import template_source_loaders, find_template_loader
 
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
+# the paths of the templates found by find_template_path, by name
+_template_paths = {}
+
+def _find_template_path(loader, name):
+    """
+    Returns the path to the template ``name`` if ``loader`` can find it,
+    without compiling the template.
+    """
+    # the cached loader wraps other loaders
+    if hasattr(loader, 'loaders'):
+        for wrapped_loader in loader.loaders:
+            try:
+                return _find_template_path(wrapped_loader, name)
+            except TemplateDoesNotExist:
+                pass
+        raise TemplateDoesNotExist(name)
+    elif hasattr(loader, 'load_template_source'):
+        _, display_name = loader.load_template_source(name)
+    else:
+        _, display_name = loader(name)
+
+    return display_name
+
 def find_template_path(name):
     """
     Same as :func:`django.template.loader.find_template`, but it only returns the path
     to the template file.
+
+    The path is only looked up the first time a template is requested. When
+    ``settings.DEBUG`` is ``True`` the paths are not remembered, so templates
+    that are added or removed while developing are found right away.
     """
+    debug = settings.DEBUG
+    if not debug:
+        path = _template_paths.get(name, None)
+        if path is not None:
+            return path
+
     global template_source_loaders
     if template_source_loaders is None:
         loaders = []
@@ -17,9 +55,21 @@ def find_template_path(name):
         template_source_loaders = tuple(loaders)
     for loader in template_source_loaders:
         try:
-            _, display_name = loader(name)
+            display_name = _find_template_path(loader, name)
             if display_name:
+                if not debug:
+                    _template_paths[name] = display_name
                 return display_name
         except TemplateDoesNotExist:
             pass
     raise TemplateDoesNotExist(name)
+
+def _reset_template_paths(sender, setting, **kwargs):
+    "Templates are found in other places when the template settings change."
+    global template_source_loaders
+    if setting in ('TEMPLATE_DIRS', 'TEMPLATE_LOADERS', 'TEMPLATES', 'INSTALLED_APPS'):
+        template_source_loaders = None
+        _template_paths.clear()
+
+setting_changed.connect(_reset_template_paths,
+    dispatch_uid='easymode.utils.template._reset_template_paths')
@@ -8,15 +8,21 @@ import re
 import StringIO
 import htmlentitydefs
 
+from django.utils.encoding import force_unicode
 from django.utils.xmlutils import SimplerXMLGenerator
 
 from xml.sax.expatreader import ExpatParser
 from xml.sax import SAXParseException
 from xml.sax.handler import EntityResolver, ContentHandler
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
 entities = re.compile(r'&([^;]+);')
 
-__all__ = ('unescape_all', 'XmlScanner', 'XmlPrinter', 'create_parser')
+__all__ = ('unescape_all', 'XmlScanner', 'XmlPrinter', 'XmlTreeBuilder', 'create_parser')
 
 def _unicode_for_entity_with_name(name):
     # if the entity is unknown, insert question mark
@@ -119,6 +125,80 @@ class XmlPrinter(SimplerXMLGenerator):
     def skippedEntity(self, name):
         self._out.write(_unicode_for_entity_with_name(name).encode('utf-8'))
 
+    def insertFragment(self, fragment):
+        """Copy ``fragment``, which is a string of xml, to the output stream as is."""
+        self.ignorableWhitespace(fragment)
+
+class XmlTreeBuilder(ContentHandler):
+    """
+    XmlTreeBuilder can be used instead of :class:`XmlPrinter`, but instead
+    of writing the xml to a stream, it builds an
+    `lxml <http://codespeak.net/lxml/>`_ element tree.
+
+    The tree can be transformed by :mod:`easymode.xslt` directly, without
+    converting it to a string and parsing it again::
+
+        xml = XmlTreeBuilder()
+        xml.startElement('title', {})
+        xml.characters(page.title)
+        xml.endElement('title')
+
+        tree = etree.ElementTree(xml.root)
+    """
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self.root = None
+        self._stack = []
+        # the last element that was closed, text that follows goes in it's tail.
+        self._last = None
+
+    def startElement(self, name, attrs):
+        if self._stack:
+            element = etree.SubElement(self._stack[-1], name)
+        else:
+            element = etree.Element(name)
+            self.root = element
+
+        # keep the attributes in the same order as XmlPrinter would
+        for (key, value) in attrs.items():
+            element.set(key, value)
+
+        self._stack.append(element)
+        self._last = None
+
+    def endElement(self, name):
+        self._last = self._stack.pop()
+
+    def characters(self, content):
+        if not content:
+            return
+        content = force_unicode(content)
+
+        if self._last is not None:
+            self._last.tail = (self._last.tail or u'') + content
+        elif self._stack:
+            self._stack[-1].text = (self._stack[-1].text or u'') + content
+
+    ignorableWhitespace = characters
+
+    def addQuickElement(self, name, contents=None, attrs=None):
+        "Convenience method for adding an element with no children"
+        self.startElement(name, attrs or {})
+        if contents is not None:
+            self.characters(contents)
+        self.endElement(name)
+
+    def skippedEntity(self, name):
+        self.characters(_unicode_for_entity_with_name(name))
+
+    def insertFragment(self, fragment):
+        """Parse ``fragment``, which is a string of xml, and add it to the tree."""
+        wrapper = etree.fromstring(u"<fragment>%s</fragment>" % fragment)
+        self.characters(wrapper.text)
+        for element in list(wrapper):
+            self._stack[-1].append(element)
+            self._last = element
+
 def create_parser(*args, **kwargs):
     """
     Because this function is defined, you can create an 
@@ -1,8 +1,21 @@
 """
 Contains xslt transformation functionality to be used with django models
 """
+import logging
+import os
+import threading
+from contextlib import contextmanager
 
-__all__ = ('XsltError', 'transform', 'prepare_string_param', 'response')
+from django.conf import settings
+
+from easymode.xslt import extensions
+from easymode.xslt.pool import StylesheetPool
+
+__all__ = ('XsltError', 'transform', 'checkout_stylesheet', 'precompile_stylesheets', 'prepare_string_param', 'response')
+
+# The pools of compiled stylesheets by path, as (modification time, pool)
+_pools = {}
+_pools_lock = threading.Lock()
 
 
 class XsltError(Exception):
@@ -17,25 +30,28 @@ def _transform_libxslt(xml, xslt, params=None):
     - `lxml <http://codespeak.net/lxml/>`_
     - `libxml <http://xmlsoft.org/python.html>`_
 
-    :param xml: The xml to be transformed.
+    :param xml: The xml to be transformed, either as a string or as an\
+        iterable of chunks (see :func:`easymode.tree.xml.iterxml`).
     :param xslt: The xslt to be used when transforming the ``xml``.
     :param params: A dictionary containing xslt parameters. Use :func:`~easymode.xslt.prepare_string_param`\
         on strings you want to pass in.
     """
+    if not isinstance(xml, basestring):
+        xml = ''.join(xml)
+
     try:
-        xslt_doc = libxml2.parseFile(xslt)
-        xslt_proc = libxslt.parseStylesheetDoc(xslt_doc)
         xml_doc = libxml2.parseDoc(xml)
-        
-        result = xslt_proc.applyStylesheet(xml_doc, params)
-
-        xml_string = str(result)
-        xml_unicode_string = xml_string.decode('utf-8')
-
-        xslt_proc.freeStylesheet()
-        xml_doc.freeDoc()
-
-        return xml_unicode_string
+        try:
+            with checkout_stylesheet(xslt) as xslt_proc:
+                result = xslt_proc.applyStylesheet(xml_doc, params)
+                try:
+                    xml_string = str(result)
+                finally:
+                    result.freeDoc()
+        finally:
+            xml_doc.freeDoc()
+
+        return xml_string.decode('utf-8')
     except RuntimeError as e:
         raise XsltError(str(e))
 
@@ -47,7 +63,9 @@ def _transform_lxml(xml, xslt_path, params=None):
     - `lxml <http://codespeak.net/lxml/>`_
     - `libxml <http://xmlsoft.org/python.html>`_
 
-    :param xml: The xml to be transformed.
+    :param xml: The xml to be transformed, either as a string, as an\
+        iterable of chunks (see :func:`easymode.tree.xml.iterxml`) or as an\
+        element tree (see :func:`easymode.tree.xml.element_tree`).
     :param xslt: The xslt to be used when transforming the ``xml``.
     :param params: A dictionary containing xslt parameters. Use :func:`~easymode.xslt.prepare_string_param`\
         on strings you want to pass in.
@@ -55,29 +73,158 @@ def _transform_lxml(xml, xslt_path, params=None):
     # assuming params where created with prepare_string_param,
     # they are encoded as unicode, which lxml does not like
     
-    xml_doc = etree.fromstring(xml)
-    xslt_doc = etree.parse(xslt_path)
-    xslt_proc = etree.XSLT(xslt_doc)
+    if isinstance(xml, basestring):
+        xml_doc = etree.fromstring(xml)
+    elif isinstance(xml, etree._ElementTree) or etree.iselement(xml):
+        # trees built by the serializer can be transformed as they are.
+        xml_doc = xml
+    else:
+        # parse the chunks as they come in, so the entire xml
+        # is never kept in memory as a string.
+        parser = etree.XMLParser()
+        for chunk in xml:
+            parser.feed(chunk)
+        xml_doc = parser.close()
 
     if params:
         for (key, value) in params.iteritems():
             params[key] = value.decode('utf-8')
-        result = xslt_proc(xml_doc, **params)
     else:
-        result = xslt_proc(xml_doc)
-    
-    return unicode(result)
+        params = {}
+
+    with checkout_stylesheet(xslt_path) as xslt_proc:
+        result = xslt_proc(xml_doc, **params)
+        return unicode(result)
+
+def _compile_libxslt(xslt_path):
+    xslt_doc = libxml2.parseFile(xslt_path)
+    return libxslt.parseStylesheetDoc(xslt_doc)
+
+def _release_libxslt(xslt_proc):
+    xslt_proc.freeStylesheet()
+
+def _compile_lxml(xslt_path):
+    xslt_doc = etree.parse(xslt_path)
+    return etree.XSLT(xslt_doc)
 
 # determine which xslt engine to use,
 try:
     from lxml import etree
 
     transform = _transform_lxml
+    transforms_trees = True
+    _compile = _compile_lxml
+    # lxml frees the stylesheets when they are garbage collected
+    _release = None
+    _register_extensions = extensions.register_lxml
 except:
     import libxslt
     import libxml2
 
     transform = _transform_libxslt
+    transforms_trees = False
+    _compile = _compile_libxslt
+    _release = _release_libxslt
+    _register_extensions = extensions.register_libxslt
+
+_register_extensions()
+
+
+def _get_pool(xslt_path):
+    """
+    Returns the :class:`~easymode.xslt.pool.StylesheetPool` for the stylesheet
+    at ``xslt_path``. When ``settings.DEBUG`` is ``True`` and the file was
+    changed, a new pool is created so the stylesheet is compiled again.
+    """
+    xslt_path = os.path.abspath(xslt_path)
+    mtime = os.path.getmtime(xslt_path) if settings.DEBUG else None
+
+    cached = _pools.get(xslt_path, None)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _pools_lock:
+        replaced = cached = _pools.get(xslt_path, None)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, StylesheetPool(xslt_path, _compile, release=_release))
+            _pools[xslt_path] = cached
+        else:
+            replaced = None
+
+    if replaced is not None:
+        # the stylesheets compiled from the old file are not used anymore.
+        replaced[1].close()
+
+    return cached[1]
+
+@contextmanager
+def checkout_stylesheet(xslt_path):
+    """
+    Provides the stylesheet at ``xslt_path``, compiled by the xslt engine
+    that is in use. No other thread uses the same compiled stylesheet until
+    the ``with`` block is finished::
+
+        with checkout_stylesheet(xslt_path) as xslt_proc:
+            result = unicode(xslt_proc(xml_doc))
+
+    Stylesheets are only compiled when no compiled instance is available.
+    When ``settings.DEBUG`` is ``True``, stylesheets are compiled again when
+    the file was changed. Otherwise the file is never looked at again.
+    See :mod:`easymode.xslt.pool` for the statistics.
+
+    :param xslt_path: The path to the xslt file, (see :func:`~easymode.utils.template.find_template_path`).
+    """
+    pool = _get_pool(xslt_path)
+    xslt_proc = pool.checkout()
+    try:
+        yield xslt_proc
+    finally:
+        pool.checkin(xslt_proc)
+
+def precompile_stylesheets(directories=None):
+    """
+    Compiles all stylesheets (files ending in ``.xsl`` or ``.xslt``) in
+    ``directories``, so the first requests that need them do not have to
+    wait for it. Call it when your application starts, for example in your
+    wsgi script::
+
+        from easymode.xslt import precompile_stylesheets
+        precompile_stylesheets()
+
+    Files that are not valid stylesheets on their own, like those that are
+    only meant to be included, are skipped.
+
+    :param directories: The directories to search, by default all template\
+        directories.
+    :rtype: A :class:`list` of the paths of the compiled stylesheets.
+    """
+    if directories is None:
+        directories = _get_template_directories()
+
+    compiled = []
+    for directory in directories:
+        for (dirpath, dirnames, filenames) in os.walk(directory):
+            for filename in filenames:
+                if filename.endswith(('.xsl', '.xslt')):
+                    xslt_path = os.path.join(dirpath, filename)
+                    try:
+                        with checkout_stylesheet(xslt_path):
+                            compiled.append(xslt_path)
+                    except Exception as e:
+                        logging.warning('Could not precompile %s: %s' % (xslt_path, e))
+
+    return compiled
+
+def _get_template_directories():
+    "Returns the template directories of the project and the installed apps"
+    directories = list(settings.TEMPLATE_DIRS)
+    try:
+        from django.template.loaders.app_directories import app_template_dirs
+        directories.extend(app_template_dirs)
+    except ImportError:
+        from django.template.utils import get_app_template_dirs
+        directories.extend(get_app_template_dirs('templates'))
+    return directories
 
 
 def prepare_string_param(string):
@@ -0,0 +1,82 @@
+"""
+Contains the executor that renders xslt in background threads, for the
+``_async`` variants of the helpers in :mod:`easymode.xslt.response`.
+
+Serializing a tree and transforming it can take a while and blocks the
+thread that does it. By rendering in a separate pool of threads, the
+calling thread (or event loop) stays free, and the number of renders that
+run at the same time is limited by :ref:`xslt_render_threads`, independent
+of the number of threads serving requests.
+
+This requires :mod:`concurrent.futures`, which is available as the
+``futures`` package on python 2.
+"""
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import translation
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    ThreadPoolExecutor = None
+
+try:
+    from django.db import close_old_connections
+except ImportError:
+    # before django 1.6 connections are simply kept by each thread.
+    close_old_connections = lambda: None
+
+
+__all__ = ('get_executor', 'submit')
+
+# The number of threads that render xslt by default.
+DEFAULT_RENDER_THREADS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """
+    Returns the :class:`~concurrent.futures.ThreadPoolExecutor` used to
+    render xslt, which is created the first time it is needed.
+    """
+    global _executor
+    if _executor is None:
+        if ThreadPoolExecutor is None:
+            raise ImproperlyConfigured("Rendering xslt in the background requires "
+                "concurrent.futures, please install the 'futures' package.")
+
+        with _executor_lock:
+            if _executor is None:
+                max_workers = getattr(settings, 'XSLT_RENDER_THREADS', DEFAULT_RENDER_THREADS)
+                _executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    return _executor
+
+def _call_with_language(language, func, args, kwargs):
+    """
+    Calls ``func`` with the language of the thread that submitted it, because
+    the active language is different for each thread.
+    """
+    close_old_connections()
+    translation.activate(language)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        translation.deactivate()
+        close_old_connections()
+
+def submit(func, *args, **kwargs):
+    """
+    Calls ``func`` with ``args`` and ``kwargs`` in one of the threads of
+    :func:`get_executor`, with the language that is active in the calling
+    thread.
+
+    Note that the database is queried using another connection, so changes
+    made in a transaction that was not committed yet are not visible.
+
+    :rtype: A :class:`~concurrent.futures.Future` with the result of ``func``.
+    """
+    return get_executor().submit(_call_with_language, translation.get_language(), func, args, kwargs)
@@ -0,0 +1,67 @@
+"""
+Contains the extension functions that can be called from the stylesheets
+used by :mod:`easymode.xslt`. To use them, declare the easymode namespace
+in the stylesheet::
+
+    <xsl:stylesheet version="1.0"
+        xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+        xmlns:easymode="http://github.com/specialunderwear/django-easymode">
+
+        <xsl:template match="/">
+            <a href="{easymode:localise-url('/about/')}">about</a>
+        </xsl:template>
+    </xsl:stylesheet>
+
+localise-url
+    Inserts the current language in an url, see
+    :func:`~easymode.middleware.localise_url`.
+"""
+from django.utils.encoding import force_unicode
+
+
+__all__ = ('NAMESPACE', 'register_lxml', 'register_libxslt')
+
+# the namespace of the extension functions.
+NAMESPACE = 'http://github.com/specialunderwear/django-easymode'
+
+def _string_value(value):
+    """
+    Returns the string value of an argument of an extension function, which
+    can be a string or a node set.
+    """
+    if isinstance(value, list):
+        if not value:
+            return u''
+        value = value[0]
+
+    if hasattr(value, 'itertext'):
+        # an lxml element
+        return u''.join(value.itertext())
+    elif hasattr(value, 'content'):
+        # a libxml2 node
+        return force_unicode(value.content)
+    return force_unicode(value)
+
+def localise_url(context, url):
+    "Implements ``easymode:localise-url``."
+    from easymode.middleware import localise_url
+    return localise_url(_string_value(url))
+
+FUNCTIONS = {
+    'localise-url': localise_url,
+}
+
+def register_lxml():
+    "Makes the extension functions available to the stylesheets compiled by lxml."
+    from lxml import etree
+
+    namespace = etree.FunctionNamespace(NAMESPACE)
+    for (name, function) in FUNCTIONS.iteritems():
+        namespace[name] = function
+
+def register_libxslt():
+    "Makes the extension functions available to the stylesheets compiled by libxslt."
+    import libxslt
+
+    for (name, function) in FUNCTIONS.iteritems():
+        libxslt.registerExtModuleFunction(name, NAMESPACE, function)
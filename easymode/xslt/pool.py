@@ -0,0 +1,157 @@
+"""
+Contains a pool of compiled stylesheets, that can be used safely by multiple
+threads at once.
+
+A compiled stylesheet must not be used by more than one thread at the same
+time. The :class:`StylesheetPool` hands out each compiled instance to one
+thread at a time and compiles new instances when all of them are in use,
+until ``settings.XSLT_POOL_SIZE`` instances exist. After that, threads wait
+until an instance is returned to the pool.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+
+__all__ = ('StylesheetPool', 'get_stats', 'reset_stats')
+
+# The number of compiled instances of a stylesheet that are kept by default.
+DEFAULT_POOL_SIZE = 10
+
+_stats = {
+    'hits': 0,
+    'compiles': 0,
+    'compile_time': 0.0,
+    'waits': 0,
+    'wait_time': 0.0,
+}
+_stats_lock = threading.Lock()
+
+def _count(**amounts):
+    with _stats_lock:
+        for (key, amount) in amounts.iteritems():
+            _stats[key] += amount
+
+def get_stats():
+    """
+    Returns the statistics of all stylesheet pools in this process:
+
+    hits
+        The number of times a compiled stylesheet was available.
+    compiles
+        The number of times a stylesheet was compiled.
+    compile_time
+        The total number of seconds spent compiling stylesheets.
+    waits
+        The number of times a thread had to wait for a stylesheet that was
+        used by other threads.
+    wait_time
+        The total number of seconds threads spent waiting.
+
+    :rtype: :class:`dict`
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+def reset_stats():
+    """Sets all statistics returned by :func:`get_stats` to zero."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = type(_stats[key])()
+
+class StylesheetPool(object):
+    """
+    Keeps the compiled instances of the stylesheet at ``xslt_path``.
+
+    usage::
+
+        pool = StylesheetPool(xslt_path, compile)
+        xslt_proc = pool.checkout()
+        try:
+            result = xslt_proc(xml_doc)
+        finally:
+            pool.checkin(xslt_proc)
+
+    When the pool is not needed anymore, call :meth:`close`, so the compiled
+    instances are released.
+
+    :param xslt_path: The path of the xslt file.
+    :param compile: A function that compiles the xslt file at the path it is passed.
+    :param max_size: The maximum number of compiled instances, by default\
+        ``settings.XSLT_POOL_SIZE``.
+    :param release: A function that frees a compiled instance, for engines\
+        that do not free them when they are garbage collected.
+    """
+    def __init__(self, xslt_path, compile, max_size=None, release=None):
+        self.xslt_path = xslt_path
+        self.compile = compile
+        self.max_size = max_size or getattr(settings, 'XSLT_POOL_SIZE', DEFAULT_POOL_SIZE)
+        self.release = release
+
+        self._free = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def checkout(self):
+        """
+        Returns a compiled instance of the stylesheet, that is not used by
+        any other thread until it is passed to :meth:`checkin`.
+        """
+        with self._condition:
+            if not self._free and self._size >= self.max_size:
+                start = time.time()
+                while not self._free and self._size >= self.max_size:
+                    self._condition.wait()
+                _count(waits=1, wait_time=time.time() - start)
+
+            if self._free:
+                _count(hits=1)
+                return self._free.pop()
+
+            # reserve a place for the instance that is compiled below.
+            self._size += 1
+
+        try:
+            start = time.time()
+            stylesheet = self.compile(self.xslt_path)
+            _count(compiles=1, compile_time=time.time() - start)
+        except:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        return stylesheet
+
+    def checkin(self, stylesheet):
+        """
+        Returns ``stylesheet`` to the pool, so other threads can use it. When
+        the pool was closed, the stylesheet is released instead.
+        """
+        with self._condition:
+            if not self._closed:
+                self._free.append(stylesheet)
+                self._condition.notify()
+                return
+            self._size -= 1
+            self._condition.notify()
+
+        if self.release is not None:
+            self.release(stylesheet)
+
+    def close(self):
+        """
+        Releases the compiled instances that are not in use. The ones that
+        are in use are released when they are returned with :meth:`checkin`.
+        """
+        with self._condition:
+            self._closed = True
+            unused = self._free
+            self._free = []
+            self._size -= len(unused)
+
+        if self.release is not None:
+            for stylesheet in unused:
+                self.release(stylesheet)
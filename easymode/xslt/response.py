@@ -7,9 +7,20 @@ from django.http import HttpResponse
 
 from easymode.tree import xml as xmltree
 from easymode.utils.template import find_template_path
-from easymode.xslt import transform
+from easymode.xslt import transform, transforms_trees
+from easymode.xslt.executor import submit
 
 
+def _xml_for_transform(object):
+    """
+    Serialize ``object`` in the form that is transformed most efficiently:
+    An element tree if the xslt engine is lxml, so the xml does not need to
+    be parsed, or chunks of xml otherwise.
+    """
+    if transforms_trees:
+        return xmltree.element_tree(object)
+    return xmltree.iterxml(object)
+
 def render_to_response(template, object, params=None, mimetype='text/html'):
     """
     ``object`` will be converted to xml using :func:`easymode.tree.xml`. The resulting xml 
@@ -25,7 +36,7 @@ def render_to_response(template, object, params=None, mimetype='text/html'):
     :rtype: :class:`django.http.HttpResponse`
     """
     xsl_path = find_template_path(template)
-    xml = xmltree.xml(object)
+    xml = _xml_for_transform(object)
     
     result = transform(xml, str(xsl_path), params)
     return HttpResponse(result, mimetype=mimetype)
@@ -43,11 +54,37 @@ def render_to_string(template, object, params=None):
     :rtype: :class:`unicode`
     """
     xsl_path = find_template_path(template)
-    xml = xmltree.xml(object)
+    xml = _xml_for_transform(object)
     
     result = transform(xml, str(xsl_path), params)
     return result
 
+def render_to_response_async(template, object, params=None, mimetype='text/html'):
+    """
+    Works like :func:`render_to_response`, but serializes and transforms
+    ``object`` in one of the threads of :mod:`easymode.xslt.executor`. A
+    future is returned right away, which will hold the
+    :class:`~django.http.HttpResponse` when rendering is finished.
+
+    In an asyncio based view, the future can be awaited like this::
+
+        response = await asyncio.wrap_future(
+            render_to_response_async('foo.xsl', Foo.objects.all()))
+
+    :rtype: :class:`concurrent.futures.Future`
+    """
+    return submit(render_to_response, template, object, params, mimetype)
+
+def render_to_string_async(template, object, params=None):
+    """
+    Works like :func:`render_to_string`, but serializes and transforms
+    ``object`` in one of the threads of :mod:`easymode.xslt.executor`.
+
+    :rtype: A :class:`concurrent.futures.Future` that will hold the\
+        transformed xml as a :class:`unicode` string.
+    """
+    return submit(render_to_string, template, object, params)
+
 def render_xml_to_string(template, input, params=None):
     """
     Transforms ``input`` using ``template``, which should be an xslt.
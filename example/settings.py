@@ -124,6 +124,7 @@ INSTALLED_APPS = (
     'django.contrib.sessions',
     'django.contrib.sites',
     'easymode',
+    'easymode.i18n.translations',
     'easymode.tests',
     'django.contrib.admin',
     'reversion',